@@ -136,10 +136,17 @@ Juan Fernández, 2023
 """
 
 
+@st.cache_resource(show_spinner=False)
+def load_svg(path):
+    # The images are read once per process, instead of from disk on every render of the tab
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
 def build_about():
     st.subheader(about_this_demo_subheading, anchor="1")
     st.markdown(about_this_demo_1_2)
-    st.image("imgs/related_ideas.svg", width=550)
+    st.image(load_svg("imgs/related_ideas.svg"), width=550)
     st.markdown(about_this_demo_2_2)
     st.markdown("<br>", unsafe_allow_html=True)
     st.subheader(possible_use_cases_subheading, anchor="2")
@@ -147,14 +154,14 @@ def build_about():
     st.markdown("<br>", unsafe_allow_html=True)
     st.subheader(architecture_subheading)
     st.markdown(architecture_1)
-    st.image("imgs/vector_space.svg", width=590)
+    st.image(load_svg("imgs/vector_space.svg"), width=590)
     st.markdown(architecture_2)
-    st.image("imgs/architecture.svg", width=590)
+    st.image(load_svg("imgs/architecture.svg"), width=590)
     st.markdown(architecture_3)
     st.markdown("<br>", unsafe_allow_html=True)
     st.subheader(graphs_subheading)
     st.markdown(graphs_1)
-    st.image("imgs/graph.svg", width=520)
+    st.image(load_svg("imgs/graph.svg"), width=520)
     st.markdown(graphs_2)
     st.markdown("<br>", unsafe_allow_html=True)
     st.subheader(future_work_subheading)
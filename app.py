@@ -7,88 +7,407 @@ The NLP engine is proprietary, this app merely visualizes the results of the NLP
 """
 
 from about import *
-from ast import literal_eval
+from bisect import bisect_left
+from caching import LRUCache
+from corpus import Corpus, CorpusStore
+from functools import partial
+from graph_store import GraphStore
+from prefetch import Prefetcher
+from search import SearchIndex, load_index
+from snapshot import load_snapshot, share_snapshot
 from styles import *
 from st_click_detector import click_detector
-from streamlit_agraph import agraph, Node, Edge, Config
+from streamlit_agraph import agraph_from_json, decode_graph, forget_graph, graph_to_json, Node, Edge, Config, TripleStore
+from streamlit_agraph.algos import GraphAlgos
+from streamlit_agraph.cluster import collapse_groups, is_cluster
+from streamlit_agraph.layout import apply_layout
 from streamlit_gsheets import GSheetsConnection
+from typing import List, NamedTuple, Optional, Tuple
+import json
+import numpy as np
+import os
 import pandas as pd
-import time
+import sqlite3
+import threading
 
 
-@st.cache_data(show_spinner=False, ttl="7m")
-def load_data_and_titles() -> tuple:
+# Directory of a local corpus snapshot (see 'snapshot.py'). If set, the corpus is read from it instead of GSheets
+SNAPSHOT_DIR = os.environ.get("TEXTMAGNET_SNAPSHOT")
+
+# Shared-memory directory (e.g. '/dev/shm/textmagnet'). If set, the corpus read from GSheets is published there and
+# memory-mapped, so all server processes of a host share a single copy
+SHARED_DIR = os.environ.get("TEXTMAGNET_SHARED_DIR")
+
+# File of precomputed graphs (see 'graph_store.py'). If set, graphs are read from it instead of built on request
+GRAPH_STORE = os.environ.get("TEXTMAGNET_GRAPH_STORE")
+
+# Directory of the search index (see 'search.py'). If set, the index is read from it (and rebuilt there when the
+# corpus changes) instead of built in memory
+SEARCH_INDEX = os.environ.get("TEXTMAGNET_SEARCH_INDEX")
+
+# Limits of the graph expansion beyond the 1st hop: max. new sents. per node, max. L2-squared score, max. nodes
+HOPS = {"max": 3, "fanout": 5, "max_dist": 0.45, "max_nodes": 2000}
+
+# Context of the sentence shown in the goal text: number of preceding and following sentences
+GOAL_WINDOW = {"before": 2, "after": 0}
+
+# Background prefetching of the closest end nodes of a shown graph: worker threads, max. queued graphs, and
+# number of end nodes whose goal text and doc are rendered ahead of the click
+PREFETCH = {"workers": 2, "queue": 64, "top_k": 5}
+
+# Max. number of links of the path between a sentence and a document
+PATH_MAX_HOPS = 8
+
+# Relation groups with more end nodes than this are collapsed into a cluster node, expanded when clicked
+CLUSTER_THRESHOLD = 25
+
+# Graph layouts: computed by the browser's physics solver, or computed here and rendered with physics disabled
+LAYOUTS = {"Physics": None, "Radial": "radial", "Force": "force"}
+
+# Serialize graphs (cached and precomputed ones too) in the compact columnar form, where the styles shared by
+# several nodes or edges are sent once
+COMPACT_GRAPHS = True
+
+
+def read_sheet() -> pd.DataFrame:
     """
     Read data from GSheets.
 
-    :return: Tuple with dataframe and a list of titles
-    :rtype: tuple
+    :return: Rows of the sheet
+    :rtype: pd.DataFrame
     """
 
     conn = st.connection("gsheets", type=GSheetsConnection)
-    data = conn.read(ttl="7m")
+    data = conn.read(ttl=0)  # the corpus store decides when to read again
     data.fillna("", inplace=True)
-    data["links"] = data["links"].apply(lambda x: literal_eval(x))
-    titles = sorted(set(data["title"]))
 
-    return data, titles
+    return data
 
 
-def build_text(data: pd.DataFrame, doc_id: str, clicked_sent_id: str) -> str:
+def load_corpus(previous: Corpus = None, hubs: LRUCache = None, search_indexes: LRUCache = None) -> Corpus:
+    """
+    Load the corpus from the configured data source (a local snapshot or GSheets).
+
+    :param previous: previous version of the corpus, whose parsed links are reused for unchanged rows
+    :type previous: Corpus
+    :param hubs: cache of the hubs of every corpus version. The hubs of a new version are found in a background
+        thread, so neither the first page nor a refresh waits for them
+    :type hubs: LRUCache
+    :param search_indexes: cache of the search index of every corpus version, built in a background thread too
+    :type search_indexes: LRUCache
+    :return: Corpus with the sentences, their titles and lookups by doc, sentence and title
+    :rtype: Corpus
     """
-    Generate the text sentence by sentence, and apply the appropriate styles to it.
 
-    :param data: data source to fetch sentences from
-    :type data: pd.DataFrame
-    :param doc_id: id of the doc to fetch sentences from
+    if SNAPSHOT_DIR:
+        corpus = load_snapshot(SNAPSHOT_DIR, previous=previous)
+    else:
+        corpus = Corpus.from_sheet(read_sheet(), previous=previous)
+        if SHARED_DIR and corpus is not previous:
+            corpus = share_snapshot(corpus, SHARED_DIR)
+
+    if hubs is not None and corpus.version not in hubs:
+        threading.Thread(target=lambda: hubs.set(corpus.version, find_hubs(corpus)), name="hubs", daemon=True).start()
+    if search_indexes is not None and corpus.version not in search_indexes:
+        threading.Thread(target=lambda: search_indexes.set(corpus.version, build_search_index(corpus)),
+                         name="search_index", daemon=True).start()
+
+    return corpus
+
+
+@st.cache_resource(show_spinner=False)
+def load_corpus_store() -> CorpusStore:
+    """
+    Create the process-wide corpus store, refreshed in the background every 7 minutes. The store (and the
+    read-only corpus in it) is shared by all sessions, instead of being copied for each of them.
+
+    :return: Store of the current corpus
+    :rtype: CorpusStore
+    """
+
+    return CorpusStore(load=partial(load_corpus, hubs=load_hubs_cache(), search_indexes=load_search_index_cache()),
+                       ttl=7 * 60)
+
+
+@st.cache_resource(show_spinner=False)
+def load_hubs_cache() -> LRUCache:
+    """
+    Create the process-wide cache of the hubs of the links' graph (keyed by corpus version), filled when a
+    corpus is loaded (see 'load_corpus'), so reruns only read them.
+
+    :return: LRU cache of hubs
+    :rtype: LRUCache
+    """
+
+    return LRUCache(maxsize=2)
+
+
+@st.cache_resource(show_spinner=False)
+def load_search_index_cache() -> LRUCache:
+    """
+    Create the process-wide cache of the full-text search index (keyed by corpus version), filled when a
+    corpus is loaded (see 'load_corpus'), so searches never wait for the index to be built.
+
+    :return: LRU cache of search indexes
+    :rtype: LRUCache
+    """
+
+    return LRUCache(maxsize=2)
+
+
+@st.cache_resource(show_spinner=False)
+def load_render_cache() -> LRUCache:
+    """
+    Create the process-wide cache of rendered docs (keyed by corpus version and doc id) and goal text excerpts.
+
+    :return: LRU cache of rendered docs and goal texts
+    :rtype: LRUCache
+    """
+
+    return LRUCache(maxsize=512)
+
+
+@st.cache_resource(show_spinner=False)
+def load_graph_cache() -> LRUCache:
+    """
+    Create the process-wide cache of serialized graphs (keyed by corpus version and 'doc_id|sent_id') and of
+    the paths between sentences and docs. Its hit and miss counts are available with 'load_graph_cache().info()'.
+
+    :return: LRU cache of serialized graphs
+    :rtype: LRUCache
+    """
+
+    return LRUCache(maxsize=1024)
+
+
+@st.cache_resource(show_spinner=False)
+def load_prefetcher() -> Prefetcher:
+    """
+    Create the process-wide prefetcher, which renders in the background the texts a user is likely to open next.
+
+    :return: Prefetcher
+    :rtype: Prefetcher
+    """
+
+    return Prefetcher(workers=PREFETCH["workers"], maxsize=PREFETCH["queue"])
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_graph_store(path: str, inode: int, mtime_ns: int) -> Optional[GraphStore]:
+    """
+    Open the file of precomputed graphs, shared by all sessions. The inode and modification time of the file
+    are part of the cache key, so a store rebuilt and moved into place is opened again.
+
+    :param path: graph store file
+    :type path: str
+    :param inode: inode of the file
+    :type inode: int
+    :param mtime_ns: modification time of the file
+    :type mtime_ns: int
+    :return: Store of precomputed graphs, or None if the file can't be read
+    :rtype: Optional[GraphStore]
+    """
+
+    try:
+        return GraphStore(path)
+    except sqlite3.Error:
+        return None
+
+
+def open_graph_store(path: str) -> Optional[GraphStore]:
+    """
+    Get the store of precomputed graphs of the current file.
+
+    :param path: graph store file
+    :type path: str
+    :return: Store of precomputed graphs, or None if the file is missing or can't be read
+    :rtype: Optional[GraphStore]
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return load_graph_store(path, stat.st_ino, stat.st_mtime_ns)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_keyword_labels(_corpus: Corpus, version: str) -> List[str]:
+    """
+    Wrap the keywords of the corpus' vocabulary into end node labels, once per corpus version.
+
+    :param _corpus: corpus whose keywords are labeled (not hashed)
+    :type _corpus: Corpus
+    :param version: version of the corpus
+    :type version: str
+    :return: Label of every keyword code
+    :rtype: List[str]
+    """
+
+    return [add_line_breaks(text=keyword) for keyword in _corpus.links.vocabulary]
+
+
+def build_search_index(corpus: Corpus) -> SearchIndex:
+    """
+    Load or build the full-text search index of the corpus (see 'load_search_index_cache').
+
+    :param corpus: corpus to search
+    :type corpus: Corpus
+    :return: Search index of the sentences and titles
+    :rtype: SearchIndex
+    """
+
+    if SEARCH_INDEX:
+        return load_index(SEARCH_INDEX, corpus)
+
+    return SearchIndex.build(corpus)
+
+
+def find_hubs(corpus: Corpus, k: int = 10) -> List[Tuple[int, int]]:
+    """
+    Find the hubs of the corpus-wide links' graph (the sentences with the highest PageRank), with the size of
+    their communities. The link table is loaded in bulk into a triple store whose node names are the rows of
+    the corpus. Slow on large corpora: run it off the request path.
+
+    :param corpus: corpus to analyze
+    :type corpus: Corpus
+    :param k: number of hubs
+    :type k: int
+    :return: list of (row, community size) tuples, best first
+    :rtype: List[Tuple[int, int]]
+    """
+
+    sources, relations, targets = corpus.graph.edges()
+    store = TripleStore()
+    store.add_triples(sources, pd.Categorical.from_codes(relations, categories=corpus.links.relations), targets)
+    algos = GraphAlgos(store)
+    community_sizes = np.bincount(algos.communities)
+
+    return [(int(algos.node_names[hub_id]), int(community_sizes[algos.communities[hub_id]]))
+            for hub_id in algos.hubs(k=k)]
+
+
+class RenderedDoc(NamedTuple):
+    """
+    HTML of a doc without any highlighted sentence, split into one fragment per sentence.
+    """
+
+    head: str
+    sent_ids: List[int]
+    sents: List[str]
+    linked: List[bool]
+    fragments: List[str]
+
+
+def render_sentence(doc_id: str, sent_id: int, sent: str, linked: bool, highlighted: bool) -> str:
+    """
+    Generate the HTML of a sentence of the text.
+
+    :param doc_id: id of the doc the sentence belongs to
     :type doc_id: str
-    :param clicked_sent_id: if True, highlight this sentence
-    :type clicked_sent_id: str
-    :return: the generated text string
+    :param sent_id: id of the sentence
+    :type sent_id: int
+    :param sent: the sentence (with the line breaks of dotted lists already added)
+    :type sent: str
+    :param linked: if True, the sentence is a hyperlink to its graph
+    :type linked: bool
+    :param highlighted: if True, highlight the sentence
+    :type highlighted: bool
+    :return: the generated HTML
     :rtype: str
     """
 
-    if clicked_sent_id:
-        clicked_sent_id = int(clicked_sent_id.split("|")[1])
+    # Add style of sent. to highlight
+    if highlighted:
+        if sent.startswith("<br>"):
+            sent = f"<br><mark style='{HIGHLIGHTED_SENT}'>{sent.lstrip('<br>')}</mark>"
+        else:
+            sent = f"<mark style='{HIGHLIGHTED_SENT}'>{sent}</mark>"
+
+    # Add style of hyperlinks
+    if not linked:
+        return f"{sent} "
+
+    return f"<a style='{TEXT_HYPERLINK}' href='#' id='{doc_id}|{sent_id}'>{sent}</a> "
 
-    filtered = data[data["doc_id"] == doc_id]
 
-    title = f"<h2>{filtered['title'].iloc[0]}</h2>"
-    text = f"<p style='{TEXT}'>"
+def render_doc(corpus: Corpus, doc_id: str) -> RenderedDoc:
+    """
+    Generate the HTML of a doc sentence by sentence, without highlighting any sentence.
+
+    :param corpus: data source to fetch sentences from
+    :type corpus: Corpus
+    :param doc_id: id of the doc to fetch sentences from
+    :type doc_id: str
+    :return: the rendered doc
+    :rtype: RenderedDoc
+    """
+
+    rows = corpus.doc_slice(doc_id)
+    filtered = corpus.data.iloc[rows]
+    sent_ids = filtered["sent_id"].tolist()
+    raw_sents = filtered["sent"].tolist()
+    linked = corpus.links.linked[rows].tolist()
 
-    zipped = list(zip(filtered["sent_id"], filtered["sent"], filtered["links"]))
-    for i, (sent_id, sent, links) in enumerate(zipped):
+    sents = []
+    for i, sent in enumerate(raw_sents):
 
         # Add a line break if sent. belongs to a dotted list
         if sent.startswith("- "):
             sent = f"<br>{sent}"
-            if i + 1 < len(zipped) and not zipped[i + 1][1].startswith("- "):
+            if i + 1 < len(raw_sents) and not raw_sents[i + 1].startswith("- "):
                 sent += "<br>"  # line break to the end if last element from dotted list
+        sents.append(sent)
 
-        # Add style of sent. to highlight
-        if sent_id == clicked_sent_id:
-            if sent.startswith("<br>"):
-                sent = f"<br><mark style='{HIGHLIGHTED_SENT}'>{sent.lstrip('<br>')}</mark>"
-            else:
-                sent = f"<mark style='{HIGHLIGHTED_SENT}'>{sent}</mark>"
+    return RenderedDoc(
+        head=f"<h2>{filtered['title'].iloc[0]}</h2><p style='{TEXT}'>",
+        sent_ids=sent_ids,
+        sents=sents,
+        linked=linked,
+        fragments=[render_sentence(doc_id, *args, highlighted=False) for args in zip(sent_ids, sents, linked)]
+    )
 
-        # Add style of hyperlinks
-        if not links:
-            text += f"{sent} "
-        else:
-            text += f"<a style='{TEXT_HYPERLINK}' href='#' id='{doc_id}|{sent_id}'>{sent}</a> "
 
-    text = title + text + "</p>"
+def build_text(corpus: Corpus, doc_id: str, clicked_sent_id: str, cache: LRUCache = None) -> str:
+    """
+    Generate the text of a doc, and apply the appropriate styles to it. The doc is rendered once (and
+    cached), and only the highlighted sentence is rendered again for every click.
 
-    return text
+    :param corpus: data source to fetch sentences from
+    :type corpus: Corpus
+    :param doc_id: id of the doc to fetch sentences from
+    :type doc_id: str
+    :param clicked_sent_id: if True, highlight this sentence
+    :type clicked_sent_id: str
+    :param cache: cache of rendered docs (the process-wide one by default)
+    :type cache: LRUCache
+    :return: the generated text string
+    :rtype: str
+    """
+
+    cache = load_render_cache() if cache is None else cache
+    doc = cache.get_or_set((corpus.version, doc_id), lambda: render_doc(corpus, doc_id))
+    fragments = doc.fragments
+
+    if clicked_sent_id:
+        clicked_sent_id = int(clicked_sent_id.split("|")[1])
+        i = bisect_left(doc.sent_ids, clicked_sent_id)
+        if i < len(doc.sent_ids) and doc.sent_ids[i] == clicked_sent_id:
+            highlighted = render_sentence(doc_id, clicked_sent_id, doc.sents[i], doc.linked[i], highlighted=True)
+            fragments = [*fragments[:i], highlighted, *fragments[i + 1:]]
 
+    return "".join([doc.head, *fragments, "</p>"])
 
-def build_goal_text(data: pd.DataFrame, doc_id: str, link_sent_id: int, color: str, node_label: str) -> str:
+
+def build_goal_text(corpus: Corpus, doc_id: str, link_sent_id: int, color: str, node_label: str,
+                    before: int = GOAL_WINDOW["before"], after: int = GOAL_WINDOW["after"],
+                    cache: LRUCache = None) -> str:
     """
-    Generate the goal text excerpt, and apply the appropriate styles to it.
+    Get the goal text excerpt from the render cache, or generate it.
 
-    :param data: data source to fetch sentences from
-    :type data: pd.DataFrame
+    :param corpus: data source to fetch sentences from
+    :type corpus: Corpus
     :param doc_id: id of the doc to fetch sentences from
     :type doc_id: str
     :param link_sent_id: id of the sent to highlight
@@ -97,15 +416,49 @@ def build_goal_text(data: pd.DataFrame, doc_id: str, link_sent_id: int, color: s
     :type color: str
     :param node_label: name of the node label
     :type node_label: str
+    :param before: number of preceding sents. shown as context
+    :type before: int
+    :param after: number of following sents. shown as context
+    :type after: int
+    :param cache: cache of rendered texts (the process-wide one by default)
+    :type cache: LRUCache
     :return: the generated goal text excerpt
     :rtype: str
     """
 
-    filtered = data[data["doc_id"] == doc_id]
+    cache = load_render_cache() if cache is None else cache
+
+    return cache.get_or_set(
+        (corpus.version, "goal", doc_id, link_sent_id, color, node_label, before, after),
+        lambda: render_goal_text(corpus, doc_id, link_sent_id, color, node_label, before, after)
+    )
+
+
+def render_goal_text(corpus: Corpus, doc_id: str, link_sent_id: int, color: str, node_label: str,
+                     before: int, after: int) -> str:
+    """
+    Generate the goal text excerpt, and apply the appropriate styles to it.
+
+    :param corpus: data source to fetch sentences from
+    :type corpus: Corpus
+    :param doc_id: id of the doc to fetch sentences from
+    :type doc_id: str
+    :param link_sent_id: id of the sent to highlight
+    :type link_sent_id: int
+    :param color: color code of the dot
+    :type color: str
+    :param node_label: name of the node label
+    :type node_label: str
+    :param before: number of preceding sents. shown as context
+    :type before: int
+    :param after: number of following sents. shown as context
+    :type after: int
+    :return: the generated goal text excerpt
+    :rtype: str
+    """
 
-    # Only an excerpt from doc is show (a context of 2 preceding sents.)
-    start_sent_id = link_sent_id - 2 if link_sent_id - 2 >= 0 else 0
-    filtered = filtered.iloc[start_sent_id:link_sent_id + 1]
+    # Only an excerpt from doc is show (the sent. with its context)
+    filtered = corpus.window(doc_id, link_sent_id, before=before, after=after)
 
     title = filtered["title"].iloc[0]
 
@@ -124,6 +477,44 @@ def build_goal_text(data: pd.DataFrame, doc_id: str, link_sent_id: int, color: s
     return goal_text
 
 
+def closest_end_nodes(nodes: List[dict], k: int = PREFETCH["top_k"]) -> Tuple[str, ...]:
+    """
+    Get the ids of the 'k' closest end nodes of a graph (lowest L2-squared score), which are the ones most
+    likely to be clicked next.
+
+    :param nodes: nodes of the graph, as dicts
+    :type nodes: List[dict]
+    :param k: number of end nodes
+    :type k: int
+    :return: ids of the end nodes, closest first
+    :rtype: Tuple[str, ...]
+    """
+
+    nodes = [node for node in nodes if isinstance(node["id"], str) and "|" in node["id"]]
+    nodes.sort(key=lambda node: node["title"] if isinstance(node.get("title"), (int, float)) else float("inf"))
+
+    return tuple(node["id"] for node in nodes[:k])
+
+
+def prefetch_links(corpus: Corpus, cache: LRUCache, end_node_ids: Tuple[str, ...]):
+    """
+    Render ahead the goal texts and the docs of end nodes of a graph. Run in the background by the prefetcher.
+
+    :param corpus: data source to fetch sentences from
+    :type corpus: Corpus
+    :param cache: cache of rendered texts
+    :type cache: LRUCache
+    :param end_node_ids: ids of the end nodes (see 'closest_end_nodes')
+    :type end_node_ids: Tuple[str, ...]
+    """
+
+    for end_node_id in end_node_ids:
+        link_doc_id, link_sent_id, color, node_label = end_node_id.split("|")
+        build_goal_text(corpus=corpus, doc_id=link_doc_id, link_sent_id=int(link_sent_id), color=color,
+                        node_label=node_label, cache=cache)
+        build_text(corpus=corpus, doc_id=link_doc_id, clicked_sent_id=None, cache=cache)
+
+
 def add_line_breaks(text: str, words_num_per_line: int = 4) -> str:
     """
     Add line breaks if text is longer than 4 words.
@@ -144,32 +535,170 @@ def add_line_breaks(text: str, words_num_per_line: int = 4) -> str:
     return " ".join(words)
 
 
+class GraphOptions(NamedTuple):
+    """
+    Options of a links' graph: number of hops, links per relation and max. distance, direction of the links,
+    doc to show the path to (instead of the links), expanded cluster nodes and layout. Hashable, so they are
+    part of the graph cache key.
+    """
+
+    hops: int = 1
+    top_k: int = None
+    max_dist: float = None
+    incoming: bool = False
+    path_to: str = None
+    expanded: frozenset = frozenset()
+    layout: str = None
+
+
+class CachedGraph(NamedTuple):
+    """
+    Serialized graph, with the ids of its closest end nodes (the ones whose texts are prefetched).
+    """
+
+    data_json: str
+    prefetch_ids: Tuple[str, ...]
+
+
 class Graph:
 
-    def __init__(self, data):
-        self.data = data
+    def __init__(self, corpus: Corpus):
+        self.corpus = corpus
         self.config = Config(from_json="graph_config.json")
+        self.fixed_config = Config(from_json="graph_config.json")  # for graphs with precomputed positions
+        self.fixed_config.physics = {**self.fixed_config.physics, "enabled": False}
 
-    def build(self, doc_id_sent_id: str) -> str:
+    def build(self, doc_id_sent_id: str, options: GraphOptions = GraphOptions()) -> str:
         """
         Build the links' graph using the 'doc_id_sent_id' variable (id of the doc and id of the sent
-        to fetch links from).
+        to fetch links from). The serialized graph is cached by sentence and options, for the current corpus
+        version.
 
         :param doc_id_sent_id: id of the doc and id of the sent to fetch links from
         :type doc_id_sent_id: str
+        :param options: what to show in the graph and how to lay it out
+        :type options: GraphOptions
         :return: id of the clicked node
         :rtype: str
         """
 
+        key = (self.corpus.version, doc_id_sent_id, options)
+        graph = load_graph_cache().get_or_set(key, lambda: self.load_graph(doc_id_sent_id, options))
+
+        # Render the texts of the closest end nodes while the user looks at the graph (once per graph)
+        if graph.prefetch_ids:
+            load_prefetcher().submit(key, partial(prefetch_links, self.corpus, load_render_cache(), graph.prefetch_ids))
+
+        # One graph component per sentence: when the options change, only the changed nodes and edges are sent
+        # and the network stays in place, and opening another sentence starts with no node selected
+        if st.session_state.get("graph_id") not in (None, doc_id_sent_id):
+            forget_graph(st.session_state["graph_id"])
+        st.session_state["graph_id"] = doc_id_sent_id
+
+        # 'selected_link' stores the id of the clicked node in the graph
+        config = self.config if options.layout is None else self.fixed_config
+        selected_link = agraph_from_json(data_json=graph.data_json, config=config, graph_id=doc_id_sent_id)
+
+        return selected_link
+
+    def load_graph(self, doc_id_sent_id: str, options: GraphOptions = GraphOptions()) -> CachedGraph:
+        """
+        Get the serialized graph of a sentence from the graph store, if it was precomputed for the current
+        corpus version (only graphs with the default options are), or build it.
+
+        :param doc_id_sent_id: id of the doc and id of the sent to fetch links from
+        :type doc_id_sent_id: str
+        :param options: what to show in the graph and how to lay it out
+        :type options: GraphOptions
+        :return: the serialized graph, with its closest end nodes
+        :rtype: CachedGraph
+        """
+
+        if GRAPH_STORE and options == GraphOptions():
+            store = open_graph_store(GRAPH_STORE)
+            if store is not None and store.version == self.corpus.version:
+                data_json = store.get(doc_id_sent_id)
+                if data_json is not None:
+                    return CachedGraph(data_json, closest_end_nodes(decode_graph(json.loads(data_json))["nodes"]))
+
+        nodes, edges = self.build_graph(doc_id_sent_id, options)
+
+        return CachedGraph(graph_to_json(nodes, edges, compact=COMPACT_GRAPHS),
+                           closest_end_nodes([node.to_dict() for node in nodes]))
+
+    def build_json(self, doc_id_sent_id: str, options: GraphOptions = GraphOptions()) -> str:
+        """
+        Build the serialized graph of a sentence (see 'build_graph').
+
+        :param doc_id_sent_id: id of the doc and id of the sent to fetch links from
+        :type doc_id_sent_id: str
+        :param options: what to show in the graph and how to lay it out
+        :type options: GraphOptions
+        :return: the serialized graph
+        :rtype: str
+        """
+
+        return graph_to_json(*self.build_graph(doc_id_sent_id, options), compact=COMPACT_GRAPHS)
+
+    def build_graph(self, doc_id_sent_id: str, options: GraphOptions = GraphOptions()) -> tuple:
+        """
+        Build the nodes and edges of the graph of a sentence, with the large relation groups collapsed into
+        cluster nodes and, optionally, the positions of the nodes.
+
+        :param doc_id_sent_id: id of the doc and id of the sent to fetch links from
+        :type doc_id_sent_id: str
+        :param options: what to show in the graph and how to lay it out
+        :type options: GraphOptions
+        :return: Tuple with the list of nodes and the list of edges
+        :rtype: tuple
+        """
+
+        if options.path_to is not None:
+            nodes, edges = self.build_path_elements(doc_id_sent_id, options.path_to)
+        else:
+            nodes, edges = collapse_groups(
+                *self.build_elements(doc_id_sent_id, options.hops, options.top_k, options.max_dist,
+                                     options.incoming),
+                threshold=CLUSTER_THRESHOLD,
+                expanded=options.expanded
+            )
+        if options.layout is not None:
+            apply_layout(nodes, edges, method=options.layout)
+
+        return nodes, edges
+
+    def build_elements(self, doc_id_sent_id: str, hops: int = 1, top_k: int = None, max_dist: float = None,
+                       incoming: bool = False) -> tuple:
+        """
+        Build the nodes and edges of the links' graph of a sentence. Beyond the 1st hop, linked sentences are
+        joined directly to the end node they were reached from. With 'incoming', the graph shows the sentences
+        that link to this one instead (read from the reverse index, without further hops).
+
+        :param doc_id_sent_id: id of the doc and id of the sent to fetch links from
+        :type doc_id_sent_id: str
+        :param hops: number of hops to expand the graph from the sentence
+        :type hops: int
+        :param top_k: max. number of linked sentences per relation (the closest ones), or None for all
+        :type top_k: int
+        :param max_dist: max. L2-squared score of the links of the sentence, or None for any
+        :type max_dist: float
+        :param incoming: show the links pointing to the sentence instead of its own links
+        :type incoming: bool
+        :return: Tuple with the list of nodes and the list of edges
+        :rtype: tuple
+        """
+
         nodes = []
         edges = []
+        end_node_ids = {}  # row of the linked sent. -> id of its (first) end node
 
         doc_id, sent_id = doc_id_sent_id.split("|")
         sent_id = int(sent_id)
 
-        filtered = self.data[(self.data["doc_id"] == doc_id) & (self.data["sent_id"] == sent_id)]
-        links = filtered["links"].iloc[0]
-        sent = filtered["sent"].iloc[0]
+        row = self.corpus.row(doc_id, sent_id)
+        links = self.corpus.links
+        keyword_labels = load_keyword_labels(self.corpus, self.corpus.version)
+        sent = self.corpus.data["sent"].iat[row]
 
         # Center node
         nodes.append(
@@ -182,61 +711,194 @@ class Graph:
             )
         )
 
-        for relation, rel_links in links.items():
-            if rel_links is not None:
+        if incoming:
+            groups = [(links.relations[code], rel_links)
+                      for code, rel_links in self.corpus.graph.incoming(row, top_k=top_k, max_dist=max_dist)]
+        else:
+            groups = [(relation, np.arange(rel_links.start, rel_links.stop))
+                      for relation, rel_links in links.groups(row, top_k=top_k, max_dist=max_dist)]
+
+        for relation, rel_links in groups:
+
+            # Intermediate node (node with the name of the relation)
+            dists = links.dist[rel_links]
+            nodes.append(
+                Node(
+                    id=relation,
+                    label=NODE["incoming_relation_label" if incoming else "relation_label"][relation],
+                    title=round(float(dists.mean()), 2),
+                    size=NODE["size"],
+                    color=NODE["color"]["intermediate"][relation]
+                )
+            )
+
+            # Join center to intermediate node
+            edges.append(
+                Edge(
+                    source=0,
+                    target=relation
+                )
+            )
 
-                # Intermediate node (node with the name of the relation)
-                dists = [link["dist"] for link in rel_links]
+            # End nodes
+            end_node_label_counts = {}
+            for i in rel_links.tolist():
+                if incoming:
+                    source_row = self.corpus.graph.sources[i]
+                    linked_doc_id = self.corpus.doc_ids[self.corpus.doc_codes[source_row]]
+                    linked_sent_id = int(self.corpus.sent_ids[source_row])
+                else:
+                    linked_doc_id = links.doc_ids[links.target_doc[i]]
+                    linked_sent_id = int(links.target_sent[i])
+                end_node_label = keyword_labels[links.keyword_code[i]]
+                end_node_label_count = end_node_label_counts.get(end_node_label, 0) + 1
+                end_node_label_counts[end_node_label] = end_node_label_count
+                if end_node_label_count > 1:  # add suffix for duplicated node labels
+                    end_node_label = f"{end_node_label} - {end_node_label_count}"  # e.g. 'flu - 2'
+                if not incoming and self.corpus.graph.target[i] >= 0:
+                    end_node_ids.setdefault(int(self.corpus.graph.target[i]),
+                                            f"{linked_doc_id}|{linked_sent_id}|{NODE['color']['end'][relation]}|"
+                                            f"{end_node_label}")
                 nodes.append(
                     Node(
-                        id=relation,
-                        label=NODE["relation_label"][relation],
-                        title=round(sum(dists) / len(dists), 2),
+                        id=f"{linked_doc_id}|{linked_sent_id}|{NODE['color']['end'][relation]}|{end_node_label}",
+                        label=end_node_label,
+                        title=float(links.dist[i]),
                         size=NODE["size"],
-                        color=NODE["color"]["intermediate"][relation]
+                        color=NODE["color"]["end"][relation]
                     )
                 )
 
-                # Join center to intermediate node
+                # Join intermediate to end node
                 edges.append(
                     Edge(
-                        source=0,
-                        target=relation
+                        source=relation,
+                        target=f"{linked_doc_id}|{linked_sent_id}|{NODE['color']['end'][relation]}|{end_node_label}"
                     )
                 )
 
-                # End nodes
-                end_node_labels = []
-                for link in rel_links:
-                    end_node_label = add_line_breaks(text=link["linked_keywords"])
-                    end_node_labels.append(end_node_label)
-                    end_node_label_count = end_node_labels.count(end_node_label)
-                    if end_node_label_count > 1:  # add suffix for duplicated node labels
-                        end_node_label = f"{end_node_label} - {end_node_label_count}"  # e.g. 'flu - 2'
-                    nodes.append(
-                        Node(
-                            id=f"{link['linked_doc_id']}|{link['linked_sent_id']}|{NODE['color']['end'][relation]}|"
-                               f"{end_node_label}",
-                            label=end_node_label,
-                            title=link["dist"],
-                            size=NODE["size"],
-                            color=NODE["color"]["end"][relation]
-                        )
+        # Further hops
+        if hops > 1 and end_node_ids:
+            expansion = self.corpus.graph.expand(
+                seeds=np.fromiter(end_node_ids, dtype=np.int64),
+                hops=hops - 1,
+                fanout=HOPS["fanout"],
+                max_dist=HOPS["max_dist"],
+                max_nodes=HOPS["max_nodes"],
+                exclude=np.array([row])
+            )
+            for hop_row, parent_row, i in zip(expansion.rows.tolist(), expansion.parents.tolist(),
+                                              expansion.links.tolist()):
+                relation = links.relations[links.relation[i]]
+                end_node_label = keyword_labels[links.keyword_code[i]]
+                end_node_id = (f"{links.doc_ids[links.target_doc[i]]}|{links.target_sent[i]}|"
+                               f"{NODE['color']['end'][relation]}|{end_node_label}")
+                end_node_ids[hop_row] = end_node_id
+                nodes.append(
+                    Node(
+                        id=end_node_id,
+                        label=end_node_label,
+                        title=float(links.dist[i]),
+                        size=NODE["size"],
+                        color=NODE["color"]["end"][relation]
                     )
+                )
 
-                    # Join intermediate to end node
-                    edges.append(
-                        Edge(
-                            source=relation,
-                            target=f"{link['linked_doc_id']}|{link['linked_sent_id']}|{NODE['color']['end'][relation]}"
-                                   f"|{end_node_label}"
-                        )
+                # Join the end node it was reached from to the new end node
+                edges.append(
+                    Edge(
+                        source=end_node_ids[parent_row],
+                        target=end_node_id,
+                        color=NODE["color"]["end"][relation],
+                        title=NODE["relation_label"][relation]
                     )
+                )
 
-        # 'selected_link' stores the id of the clicked node in the graph
-        selected_link = agraph(nodes=nodes, edges=edges, config=self.config)  # render graph
+        return nodes, edges
 
-        return selected_link
+    def find_path(self, doc_id_sent_id: str, doc_id: str) -> Optional[np.ndarray]:
+        """
+        Find a shortest chain of links from a sentence to any sentence of a doc. The result is cached with the
+        graphs, so the graph of the path and the app's "no path" notice share a single search.
+
+        :param doc_id_sent_id: id of the doc and id of the sent the path starts from
+        :type doc_id_sent_id: str
+        :param doc_id: id of the doc the path ends in
+        :type doc_id: str
+        :return: positions of the links of the path, or None if the doc is not reachable within
+            'PATH_MAX_HOPS' links
+        :rtype: Optional[np.ndarray]
+        """
+
+        source_doc_id, sent_id = doc_id_sent_id.split("|")
+        doc_rows = self.corpus.doc_slice(doc_id)
+
+        return load_graph_cache().get_or_set(
+            (self.corpus.version, "path", doc_id_sent_id, doc_id),
+            lambda: self.corpus.graph.shortest_path(
+                sources=np.array([self.corpus.row(source_doc_id, int(sent_id))]),
+                targets=np.arange(doc_rows.start, doc_rows.stop),
+                max_hops=PATH_MAX_HOPS
+            )
+        )
+
+    def build_path_elements(self, doc_id_sent_id: str, doc_id: str) -> tuple:
+        """
+        Build the nodes and edges of the path from a sentence to a doc: a chain of end nodes, joined by edges
+        labelled with the relation of every link. Only the center node is built if there is no path.
+
+        :param doc_id_sent_id: id of the doc and id of the sent the path starts from
+        :type doc_id_sent_id: str
+        :param doc_id: id of the doc the path ends in
+        :type doc_id: str
+        :return: Tuple with the list of nodes and the list of edges
+        :rtype: tuple
+        """
+
+        source_doc_id, sent_id = doc_id_sent_id.split("|")
+        links = self.corpus.links
+        keyword_labels = load_keyword_labels(self.corpus, self.corpus.version)
+
+        # Center node
+        nodes = [
+            Node(
+                id=0,
+                label="",
+                title=self.corpus.data["sent"].iat[self.corpus.row(source_doc_id, int(sent_id))],
+                size=NODE["size"],
+                color=NODE["color"]["central"]
+            )
+        ]
+        edges = []
+
+        path = self.find_path(doc_id_sent_id, doc_id)
+        for i in ([] if path is None else path.tolist()):
+            relation = links.relations[links.relation[i]]
+            end_node_label = keyword_labels[links.keyword_code[i]]
+            end_node_id = (f"{links.doc_ids[links.target_doc[i]]}|{links.target_sent[i]}|"
+                           f"{NODE['color']['end'][relation]}|{end_node_label}")
+            nodes.append(
+                Node(
+                    id=end_node_id,
+                    label=end_node_label,
+                    title=float(links.dist[i]),
+                    size=NODE["size"],
+                    color=NODE["color"]["end"][relation]
+                )
+            )
+
+            # Join the previous node of the path to the new end node
+            edges.append(
+                Edge(
+                    source=nodes[-2].id,
+                    target=end_node_id,
+                    color=NODE["color"]["end"][relation],
+                    label=NODE["relation_label"][relation],
+                    title=NODE["relation_label"][relation]
+                )
+            )
+
+        return nodes, edges
 
 
 def add_to_history(title: str, max_length=10):
@@ -261,17 +923,31 @@ def define_text_input_from_title_selectbox():
     Callback func. to assign title from titles selectbox to st.session_state["text_input"]
     """
 
-    st.session_state["text_input"] = data[data["title"] == st.session_state["titles_input"]]["doc_id"].iloc[0]
+    st.session_state["text_input"] = corpus.doc_id_for_title(st.session_state["titles_input"])
     add_to_history(title=st.session_state["titles_input"])
     st.session_state["clicked_sent_id"] = None  # reset
     st.session_state["titles_input"] = None  # reset
 
 
+def define_text_input_from_row(row: int):
+    """
+    Callback func. to open the doc of a sentence (e.g. a hub or a search result), with the sentence clicked
+
+    :param row: row position of the sentence
+    :type row: int
+    """
+
+    doc_id_sent_id = corpus.doc_id_sent_id(row)
+    st.session_state["text_input"] = doc_id_sent_id.split("|")[0]
+    add_to_history(title=corpus.title(st.session_state["text_input"]))
+    st.session_state["clicked_sent_id"] = doc_id_sent_id
+
+
 def define_text_input_from_history_selectbox():
     """
     Callback func. to assign title from history selectbox to st.session_state["text_input"]
     """
-    st.session_state["text_input"] = data[data["title"] == st.session_state["history_input"]]["doc_id"].iloc[0]
+    st.session_state["text_input"] = corpus.doc_id_for_title(st.session_state["history_input"])
     st.session_state["clicked_sent_id"] = None  # reset
     st.session_state["history_input"] = None  # reset
 
@@ -289,6 +965,9 @@ if __name__ == "__main__":
     if "history" not in st.session_state:
         st.session_state["history"] = []
 
+    if "expanded_clusters" not in st.session_state:
+        st.session_state["expanded_clusters"] = {}  # ids of the expanded cluster nodes, by sentence
+
     if st.session_state["end_of_script"] == "end":
         st.session_state["clicked_sent_id"] = None  # reset
         st.session_state["end_of_script"] = None  # reset
@@ -296,7 +975,7 @@ if __name__ == "__main__":
     # Load demo data
 
     with st.spinner(text=""):
-        data, titles = load_data_and_titles()
+        corpus = load_corpus_store().get()
 
     # Build sidebar
 
@@ -306,13 +985,100 @@ if __name__ == "__main__":
         st.markdown("*Discover hidden connections in medical texts*")
         st.selectbox(
             label="title",
-            options=titles,
+            options=corpus.titles,
             index=None,
             on_change=define_text_input_from_title_selectbox,
             key="titles_input",
             placeholder="Titles",
             label_visibility="collapsed"
         )
+        search_query = st.text_input(
+            label="search",
+            key="search_query",
+            placeholder="Search sentences",
+            label_visibility="collapsed"
+        )
+        if search_query:
+            search_index = load_search_index_cache().get(corpus.version)
+            results = [] if search_index is None else search_index.search(search_query, k=10)
+            if search_index is None:
+                st.caption("Indexing sentences…")
+            elif not results:
+                st.caption("No sentences found")
+            for result_row, _ in results:
+                result_doc_id = corpus.doc_id_sent_id(result_row).split("|")[0]
+                st.button(
+                    label=f"{corpus.title(result_doc_id)}: {corpus.data['sent'].iat[result_row][:60]}…",
+                    key=f"search_{result_row}",
+                    on_click=define_text_input_from_row,
+                    args=(result_row,)
+                )
+        st.slider(
+            label="Hops",
+            min_value=1,
+            max_value=HOPS["max"],
+            value=1,
+            key="hops",
+            help="Expand the graph to the ideas related to the related ideas"
+        )
+
+        st.toggle(
+            label="Incoming links",
+            key="incoming",
+            help="Show the ideas that point to the clicked sentence instead of the ones it points to"
+        )
+
+        st.select_slider(
+            label="Links per relation",
+            options=[1, 3, 5, 10, 20, "All"],
+            value="All",
+            key="top_k",
+            help="Show only the closest related ideas of every relation"
+        )
+
+        max_dist = float(np.ceil(corpus.links.dist.max(initial=0) * 20) / 20)  # rounded up to the slider's step
+        st.slider(
+            label="Max. distance",
+            min_value=0.0,
+            max_value=max(max_dist, 0.05),
+            value=max(max_dist, 0.05),
+            step=0.05,
+            key="max_dist",
+            help="Show only the related ideas up to this L2-squared score (lower is closer)"
+        )
+
+        st.selectbox(
+            label="Path to",
+            options=corpus.titles,
+            index=None,
+            key="path_to",
+            placeholder="Path to…",
+            help="Show the shortest chain of related ideas from the clicked sentence to a text, instead of its "
+                 "related ideas"
+        )
+
+        st.radio(
+            label="Layout",
+            options=list(LAYOUTS),
+            key="layout",
+            horizontal=True,
+            help="Physics: nodes settle in your browser. Radial/Force: positions are computed on the server, "
+                 "so big graphs render instantly (graphs of more than 300 nodes are laid out radially)"
+        )
+
+        with st.expander("Hubs"):
+            hubs = load_hubs_cache().get(corpus.version)
+            if hubs is None:
+                st.caption("Finding hubs…")
+            for hub, community_size in hubs or []:
+                hub_doc_id = corpus.doc_id_sent_id(hub).split("|")[0]
+                st.button(
+                    label=f"{corpus.title(hub_doc_id)}: {corpus.data['sent'].iat[hub][:60]}…",
+                    key=f"hub_{hub}",
+                    help=f"Cluster of {community_size} related sentences",
+                    on_click=define_text_input_from_row,
+                    args=(hub,)
+                )
 
         st.markdown("""
         &nbsp;
@@ -332,9 +1098,9 @@ if __name__ == "__main__":
 
     # Build Explorer and About layout
     with st.spinner(""):
-        time.sleep(0.3)
 
-        explorer, about = st.tabs(["Explorer", "About"])
+        # Switching tabs reruns the app, so the About tab is only built while it is open
+        explorer, about = st.tabs(["Explorer", "About"], key="tab", on_change="rerun")
 
         with explorer:
             left, right = st.columns([0.5, 0.5], gap="large")
@@ -345,10 +1111,11 @@ if __name__ == "__main__":
                 history = st.empty()
                 graph = st.empty()
 
-        with about:
-            _left, _center, _right = st.columns([0.225, 0.55, 0.225])
-            with _center:
-                build_about()
+        if about.open:
+            with about:
+                _left, _center, _right = st.columns([0.225, 0.55, 0.225])
+                with _center:
+                    build_about()
 
         # Build history selectbox
 
@@ -369,7 +1136,7 @@ if __name__ == "__main__":
         if st.session_state["text_input"]:
             with text:
                 text_output = click_detector(
-                    html_content=build_text(data=data, doc_id=st.session_state["text_input"],
+                    html_content=build_text(corpus=corpus, doc_id=st.session_state["text_input"],
                                             clicked_sent_id=st.session_state["clicked_sent_id"]),
                     key="clicked_sent_id"
                 )
@@ -377,9 +1144,30 @@ if __name__ == "__main__":
             # Build graph
 
             if text_output:
-                with graph:
-                    g = Graph(data=data)
-                    graph_output = g.build(doc_id_sent_id=text_output)
+                with graph.container():
+                    g = Graph(corpus=corpus)
+                    expanded = st.session_state["expanded_clusters"].get(text_output, frozenset())
+                    options = GraphOptions(
+                        hops=st.session_state["hops"],
+                        top_k=None if st.session_state["top_k"] == "All" else st.session_state["top_k"],
+                        max_dist=None if st.session_state["max_dist"] >= max_dist else st.session_state["max_dist"],
+                        incoming=st.session_state["incoming"],
+                        path_to=corpus.doc_id_for_title(st.session_state["path_to"])
+                        if st.session_state["path_to"] else None,
+                        expanded=expanded,
+                        layout=LAYOUTS[st.session_state["layout"]]
+                    )
+                    graph_output = g.build(doc_id_sent_id=text_output, options=options)
+                    if options.path_to is not None and g.find_path(text_output, options.path_to) is None:
+                        st.caption(f"No path within {PATH_MAX_HOPS} links to '{st.session_state['path_to']}'")
+
+                # Expand a clicked cluster node
+
+                if is_cluster(graph_output):
+                    if graph_output not in expanded:
+                        st.session_state["expanded_clusters"][text_output] = expanded | {graph_output}
+                        st.rerun()
+                    graph_output = None
 
                 # Build goal text
 
@@ -387,7 +1175,7 @@ if __name__ == "__main__":
                     with goal:
                         link_doc_id, link_sent_id, color, node_label = graph_output.split("|")
                         goal_output = click_detector(
-                            html_content=build_goal_text(data=data, doc_id=link_doc_id,
+                            html_content=build_goal_text(corpus=corpus, doc_id=link_doc_id,
                                                          link_sent_id=int(link_sent_id), color=color,
                                                          node_label=node_label),
                             key="clicked_goal"
@@ -397,7 +1185,7 @@ if __name__ == "__main__":
 
                         if goal_output:
                             st.session_state["text_input"] = goal_output
-                            add_to_history(title=data[data["doc_id"] == goal_output]["title"].iloc[0])
+                            add_to_history(title=corpus.title(goal_output))
                             del st.session_state["clicked_goal"]
                             st.session_state["end_of_script"] = "end"
                             st.rerun()
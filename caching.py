@@ -0,0 +1,104 @@
+"""
+Bounded in-memory caches shared by all sessions of the app (e.g. rendered documents), keyed by the
+corpus version so entries of a refreshed corpus are never served.
+"""
+
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Hashable
+import threading
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class LRUCache:
+    """
+    Thread-safe cache that keeps at most 'maxsize' entries, evicting the least recently used one.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value of a key, and mark it as the most recently used.
+
+        :param key: key to look up
+        :type key: Hashable
+        :param default: value returned if the key is not cached
+        :type default: Any
+        :return: cached value, or 'default'
+        :rtype: Any
+        """
+
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Cache the value of a key, evicting the least recently used entry if the cache is full.
+
+        :param key: key to cache
+        :type key: Hashable
+        :param value: value to cache
+        :type value: Any
+        """
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """
+        Get the value of a key, building and caching it on a miss. The value is built outside the lock, so
+        a slow build doesn't block readers of other keys.
+
+        :param key: key to look up
+        :type key: Hashable
+        :param build: function that builds the value
+        :type build: Callable[[], Any]
+        :return: cached or built value
+        :rtype: Any
+        """
+
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = build()
+            self.set(key, value)
+
+        return value
+
+    def clear(self):
+        """
+        Remove all the entries (hit and miss counts are kept).
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> CacheInfo:
+        """
+        Get the statistics of the cache, like 'functools.lru_cache'.
+
+        :return: hits, misses, max. size and current size
+        :rtype: CacheInfo
+        """
+
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
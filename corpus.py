@@ -0,0 +1,560 @@
+"""
+In-memory representation of the TextMagnet corpus: the table of sentences read from the data source,
+plus the lookups the app needs to serve documents and sentences without scanning the whole table.
+"""
+
+from ast import literal_eval
+from typing import Callable, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from linkgraph import LinkGraph, expand_ranges
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tokens of a Python literal that are written differently in JSON: strings without escapes, and None/True/False
+_LITERAL_TOKENS = re.compile(r"""'[^'\\]*'|"[^"\\]*"|None|True|False""")
+_JSON_NAMES = {"None": "null", "True": "true", "False": "false"}
+
+
+def _json_token(match: re.Match) -> str:
+    token = match.group()
+    if token[0] == "'":
+        return '"' + token[1:-1].replace('"', '\\"') + '"'
+    if token[0] == '"':
+        return token
+
+    return _JSON_NAMES[token]
+
+
+def parse_literal(value: str):
+    """
+    Parse a Python literal (e.g. a 'links' dict). Literals without backslashes are translated to JSON and
+    parsed by the C JSON decoder, several times faster than 'literal_eval', which parses the rest.
+
+    :param value: the literal
+    :type value: str
+    :return: the parsed value
+    """
+
+    if "\\" not in value:
+        try:
+            return json.loads(_LITERAL_TOKENS.sub(_json_token, value))
+        except ValueError:
+            pass
+
+    return literal_eval(value)
+
+
+def _freeze(*arrays: np.ndarray):
+    """
+    Make arrays read-only, so a corpus can be shared by all sessions (and threads) without copies.
+
+    :param arrays: arrays to freeze
+    :type arrays: np.ndarray
+    """
+
+    for array in arrays:
+        array.setflags(write=False)
+
+
+class LinkTable:
+    """
+    Columnar store of the links between sentences, parsed once from the 'links' column.
+
+    Links are laid out in CSR order: the links of row i are the positions offsets[i]:offsets[i + 1] of the
+    per-link arrays, grouped by relation in the order they appear in the sheet and sorted by distance within
+    each group (see 'sort_groups'). The relation groups are indexed too: the groups of row i are
+    row_groups[i]:row_groups[i + 1], and group g spans the positions group_offsets[g]:group_offsets[g + 1].
+    Relations, target docs and keywords are stored as integer codes into the 'relations', 'doc_ids' and
+    'vocabulary' lists, so every distinct keyword is stored once for the whole corpus.
+    """
+
+    def __init__(self, offsets: np.ndarray, linked: np.ndarray, relation: np.ndarray, target_doc: np.ndarray,
+                 target_sent: np.ndarray, dist: np.ndarray, keyword_code: np.ndarray, relations: List[str],
+                 doc_ids: List[str], vocabulary: List[str]):
+        self.offsets = offsets
+        self.linked = linked  # sentence has a (possibly empty) links' dict, i.e. it is rendered as a hyperlink
+        self.relation = relation
+        self.target_doc = target_doc
+        self.target_sent = target_sent
+        self.dist = dist
+        self.keyword_code = keyword_code
+        self.relations = relations
+        self.doc_ids = doc_ids
+        self.vocabulary = vocabulary
+
+        # A group starts at the first link of a row and wherever the relation changes
+        group_starts = np.zeros(len(relation), dtype=bool)
+        group_starts[offsets[:-1][np.diff(offsets) > 0]] = True
+        group_starts[1:] |= relation[1:] != relation[:-1]
+        group_starts = np.flatnonzero(group_starts)
+        self.group_offsets = np.append(group_starts, len(relation))
+        self.row_groups = np.searchsorted(group_starts, offsets)
+
+        _freeze(offsets, linked, relation, target_doc, target_sent, dist, keyword_code, self.group_offsets,
+                self.row_groups)
+
+    @classmethod
+    def parse(cls, links: Iterable[str], doc_ids: List[str]) -> "LinkTable":
+        """
+        Parse the 'links' column (one dict literal per row, mapping relations to lists of links).
+
+        :param links: values of the 'links' column, in row order
+        :type links: Iterable[str]
+        :param doc_ids: known doc ids; linked docs not found here are appended to the table's own list
+        :type doc_ids: List[str]
+        :return: the parsed links
+        :rtype: LinkTable
+        """
+
+        relation_codes, keyword_codes = {}, {}
+        doc_codes = {doc_id: code for code, doc_id in enumerate(doc_ids)}
+        counts, linked = [], []
+        relation, target_doc, target_sent, dist, keyword_code = [], [], [], [], []
+        parsed = {"": {}}  # every distinct value is parsed once
+
+        for value in links:
+            row_links = parsed.get(value)
+            if row_links is None:
+                row_links = parsed[value] = parse_literal(value)
+            linked.append(bool(row_links))
+            count = 0
+            for rel, rel_links in row_links.items():
+                if not rel_links:
+                    continue
+                code = relation_codes.setdefault(rel, len(relation_codes))
+                for link in rel_links:
+                    relation.append(code)
+                    target_doc.append(doc_codes.setdefault(link["linked_doc_id"], len(doc_codes)))
+                    target_sent.append(link["linked_sent_id"])
+                    dist.append(link["dist"])
+                    keyword_code.append(keyword_codes.setdefault(link["linked_keywords"], len(keyword_codes)))
+                count += len(rel_links)
+            counts.append(count)
+
+        return cls(
+            offsets=np.concatenate(([0], np.cumsum(counts, dtype=np.int64))),
+            linked=np.array(linked, dtype=bool),
+            relation=np.array(relation, dtype=np.int8),
+            target_doc=np.array(target_doc, dtype=np.int32),
+            target_sent=np.array(target_sent, dtype=np.int32),
+            dist=np.array(dist, dtype=np.float64),
+            keyword_code=np.array(keyword_code, dtype=np.int32),
+            relations=list(relation_codes),
+            doc_ids=list(doc_codes),
+            vocabulary=list(keyword_codes)
+        ).sort_groups()
+
+    @classmethod
+    def concat(cls, tables: List["LinkTable"], doc_ids: List[str]) -> "LinkTable":
+        """
+        Concatenate the rows of several tables, recoding their relations, target docs and keywords to shared
+        lists. Keywords no longer used by any link are left out of the vocabulary.
+
+        :param tables: tables to concatenate
+        :type tables: List[LinkTable]
+        :param doc_ids: known doc ids; linked docs not found here are appended to the table's own list
+        :type doc_ids: List[str]
+        :return: the concatenated links
+        :rtype: LinkTable
+        """
+
+        relation_codes, keyword_codes = {}, {}
+        doc_codes = {doc_id: code for code, doc_id in enumerate(doc_ids)}
+        relation, target_doc, keyword_code, offsets = [], [], [], [np.zeros(1, dtype=np.int64)]
+        for table in tables:
+            relation_map = np.array([relation_codes.setdefault(r, len(relation_codes)) for r in table.relations],
+                                    dtype=np.int8)
+            doc_map = np.array([doc_codes.setdefault(d, len(doc_codes)) for d in table.doc_ids], dtype=np.int32)
+            relation.append(relation_map[table.relation] if len(relation_map) else table.relation)
+            target_doc.append(doc_map[table.target_doc] if len(doc_map) else table.target_doc)
+            offsets.append(table.offsets[1:] - table.offsets[0] + offsets[-1][-1])
+            keyword_map = np.full(len(table.vocabulary), -1, dtype=np.int32)
+            for code in np.unique(table.keyword_code).tolist():
+                keyword_map[code] = keyword_codes.setdefault(table.vocabulary[code], len(keyword_codes))
+            keyword_code.append(keyword_map[table.keyword_code])
+
+        return cls(
+            offsets=np.concatenate(offsets),
+            linked=np.concatenate([table.linked for table in tables]),
+            relation=np.concatenate(relation).astype(np.int8),
+            target_doc=np.concatenate(target_doc).astype(np.int32),
+            target_sent=np.concatenate([table.target_sent for table in tables]),
+            dist=np.concatenate([table.dist for table in tables]),
+            keyword_code=np.concatenate(keyword_code).astype(np.int32),
+            relations=list(relation_codes),
+            doc_ids=list(doc_codes),
+            vocabulary=list(keyword_codes)
+        )
+
+    def take(self, rows: np.ndarray) -> "LinkTable":
+        """
+        Select the links of some rows, in the given order.
+
+        :param rows: row positions to select
+        :type rows: np.ndarray
+        :return: the links of the selected rows
+        :rtype: LinkTable
+        """
+
+        counts = self.offsets[rows + 1] - self.offsets[rows]
+        positions = expand_ranges(self.offsets[rows], counts)
+
+        return LinkTable(
+            offsets=np.concatenate(([0], np.cumsum(counts))),
+            linked=self.linked[rows],
+            relation=self.relation[positions],
+            target_doc=self.target_doc[positions],
+            target_sent=self.target_sent[positions],
+            dist=self.dist[positions],
+            keyword_code=self.keyword_code[positions],
+            relations=self.relations,
+            doc_ids=self.doc_ids,
+            vocabulary=self.vocabulary
+        )
+
+    def sort_groups(self) -> "LinkTable":
+        """
+        Sort the links of every relation group by distance (closest first), keeping the order of the groups.
+
+        :return: the sorted links
+        :rtype: LinkTable
+        """
+
+        group = np.repeat(np.arange(len(self.group_offsets) - 1), np.diff(self.group_offsets))
+        positions = np.lexsort((self.dist, group))
+
+        return LinkTable(
+            offsets=self.offsets,
+            linked=self.linked,
+            relation=self.relation[positions],
+            target_doc=self.target_doc[positions],
+            target_sent=self.target_sent[positions],
+            dist=self.dist[positions],
+            keyword_code=self.keyword_code[positions],
+            relations=self.relations,
+            doc_ids=self.doc_ids,
+            vocabulary=self.vocabulary
+        )
+
+    def __len__(self) -> int:
+        return len(self.relation)
+
+    def groups(self, row: int, top_k: Optional[int] = None, max_dist: Optional[float] = None) -> List[Tuple[str, slice]]:
+        """
+        Split the links of a row by relation. Links are sorted by distance within a relation, so the filters
+        only shorten the slices.
+
+        :param row: row position of the sentence
+        :type row: int
+        :param top_k: max. number of links per relation (the closest ones), or None for all
+        :type top_k: Optional[int]
+        :param max_dist: max. distance of the links, or None for any
+        :type max_dist: Optional[float]
+        :return: list of (relation, slice of link positions) tuples, in sheet order (relations left without
+            links are skipped)
+        :rtype: List[Tuple[str, slice]]
+        """
+
+        first, last = int(self.row_groups[row]), int(self.row_groups[row + 1])
+        bounds = self.group_offsets[first:last + 1].tolist()
+
+        groups = []
+        for lo, hi in zip(bounds, bounds[1:]):
+            if max_dist is not None:
+                hi = lo + int(np.searchsorted(self.dist[lo:hi], max_dist, side="right"))
+            if top_k is not None:
+                hi = min(hi, lo + top_k)
+            if lo < hi:
+                groups.append((self.relations[self.relation[lo]], slice(lo, hi)))
+
+        return groups
+
+    def keyword(self, i: int) -> str:
+        """
+        Get the keywords of a link.
+
+        :param i: position of the link
+        :type i: int
+        :return: linked keywords
+        :rtype: str
+        """
+
+        return self.vocabulary[self.keyword_code[i]]
+
+
+class Corpus:
+    """
+    Sentence table with precomputed lookups (doc_id → row slice, (doc_id, sent_id) → row and
+    title → doc_id), and the links between sentences as a LinkTable aligned with the rows.
+
+    A corpus is read-only once built (its arrays are frozen), so a single instance is shared by every session
+    of the server process.
+
+    Rows are grouped by document (in order of first appearance) and sorted by sentence id, so every
+    document is a contiguous block of rows that can be sliced in O(1). 'row_hashes' identify the content of
+    every row of the sheet, so a refreshed sheet only needs its changed rows parsed.
+    """
+
+    def __init__(self, data: pd.DataFrame, links: LinkTable, row_hashes: np.ndarray):
+        doc_codes, doc_ids = pd.factorize(data["doc_id"])
+        if (np.diff(doc_codes) < 0).any():
+            raise ValueError("Rows must be grouped by doc_id")
+
+        self.data = data
+        self.links = links
+        self.row_hashes = row_hashes
+        self.version = hashlib.blake2b(np.ascontiguousarray(row_hashes).tobytes(), digest_size=8).hexdigest()
+        self.doc_ids = list(doc_ids)
+        self.doc_codes = doc_codes
+        self.sent_ids = self.data["sent_id"].to_numpy()
+        self.doc_offsets = np.concatenate(([0], np.cumsum(np.bincount(self.doc_codes, minlength=len(doc_ids)))))
+        _freeze(self.row_hashes, self.doc_codes, self.sent_ids, self.doc_offsets)
+        self.titles = sorted(set(self.data["title"]))
+
+        self._doc_codes = {doc_id: code for code, doc_id in enumerate(self.doc_ids)}
+        doc_titles = self.data["title"].to_numpy()[self.doc_offsets[:-1]]
+        self._title_to_doc_id = {}
+        for doc_id, title in zip(self.doc_ids, doc_titles):
+            self._title_to_doc_id.setdefault(title, doc_id)  # first doc with a given title wins
+
+        self.graph = LinkGraph(links.offsets, self._target_rows(), links.relation, links.dist)
+
+    @classmethod
+    def from_sheet(cls, data: pd.DataFrame, previous: Optional["Corpus"] = None) -> "Corpus":
+        """
+        Build the corpus from the sheet's rows: group them by doc and parse their 'links' column.
+
+        If a previous version of the corpus is given, only the links of new or changed rows are parsed, and
+        the previous corpus itself is returned if no row changed.
+
+        :param data: rows of the sheet, with the 'links' column as dict literals
+        :type data: pd.DataFrame
+        :param previous: previous version of the corpus
+        :type previous: Optional[Corpus]
+        :return: the corpus
+        :rtype: Corpus
+        """
+
+        doc_codes, doc_ids = pd.factorize(data["doc_id"])
+        order = np.lexsort((data["sent_id"].to_numpy(), doc_codes))  # stable: keeps sheet order on ties
+        data = data.iloc[order].reset_index(drop=True)
+        row_hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+        if previous is None:
+            links = LinkTable.parse(data["links"], list(doc_ids))
+        elif np.array_equal(row_hashes, previous.row_hashes):
+            return previous
+        else:
+            # Match rows to unchanged rows of the previous version by their hash
+            hashes, first_rows = np.unique(previous.row_hashes, return_index=True)
+            pos = np.minimum(np.searchsorted(hashes, row_hashes), max(len(hashes) - 1, 0))
+            reused = hashes[pos] == row_hashes if len(hashes) else np.zeros(len(data), dtype=bool)
+            changed = np.flatnonzero(~reused)
+            logger.info("Corpus refresh: %d of %d rows changed", len(changed), len(data))
+
+            fresh = LinkTable.parse(data["links"].iloc[changed], list(doc_ids))
+            source_rows = np.empty(len(data), dtype=np.int64)  # rows of the previous links, then the fresh ones
+            source_rows[reused] = first_rows[pos[reused]]
+            source_rows[changed] = len(previous) + np.arange(len(changed))
+            links = LinkTable.concat([previous.links, fresh], list(doc_ids)).take(source_rows)
+
+        return cls(data.drop(columns="links"), links, row_hashes)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def _target_rows(self) -> np.ndarray:
+        """
+        Resolve the target sentence of every link to its row position, vectorized.
+
+        :return: row position of the target of every link (-1 if the target isn't in the corpus)
+        :rtype: np.ndarray
+        """
+
+        links = self.links
+        doc_map = np.array([self._doc_codes.get(doc_id, -1) for doc_id in links.doc_ids], dtype=np.int64)
+        target_doc = doc_map[links.target_doc] if len(links) else np.empty(0, dtype=np.int64)
+
+        # Rows are sorted by (doc, sent. id), so a combined key is sorted too and can be binary searched
+        stride = int(max(self.sent_ids.max(initial=0), links.target_sent.max(initial=0))) + 1
+        keys = self.doc_codes.astype(np.int64) * stride + self.sent_ids
+        target_keys = target_doc * stride + links.target_sent
+        rows = np.minimum(np.searchsorted(keys, target_keys), max(len(keys) - 1, 0))
+        found = (target_doc >= 0) & (keys[rows] == target_keys) if len(keys) else np.zeros(len(links), dtype=bool)
+        rows = np.where(found, rows, -1)
+        _freeze(rows)
+
+        return rows
+
+    def doc_slice(self, doc_id: str) -> slice:
+        """
+        Get the positional slice of rows that belong to a doc.
+
+        :param doc_id: id of the doc
+        :type doc_id: str
+        :return: slice of row positions
+        :rtype: slice
+        """
+
+        code = self._doc_codes[doc_id]
+
+        return slice(int(self.doc_offsets[code]), int(self.doc_offsets[code + 1]))
+
+    def doc(self, doc_id: str) -> pd.DataFrame:
+        """
+        Get the sentences of a doc, ordered by sentence id.
+
+        :param doc_id: id of the doc
+        :type doc_id: str
+        :return: view of the rows of the doc
+        :rtype: pd.DataFrame
+        """
+
+        return self.data.iloc[self.doc_slice(doc_id)]
+
+    def row(self, doc_id: str, sent_id: int) -> int:
+        """
+        Get the row position of a sentence.
+
+        :param doc_id: id of the doc the sentence belongs to
+        :type doc_id: str
+        :param sent_id: id of the sentence
+        :type sent_id: int
+        :return: row position of the sentence
+        :rtype: int
+        """
+
+        rows = self.doc_slice(doc_id)
+        pos = rows.start + int(np.searchsorted(self.sent_ids[rows], sent_id))  # docs are short: ~O(1)
+        if pos == rows.stop or self.sent_ids[pos] != sent_id:
+            raise KeyError(f"{doc_id}|{sent_id}")
+
+        return pos
+
+    def window(self, doc_id: str, sent_id: int, before: int = 2, after: int = 0) -> pd.DataFrame:
+        """
+        Get a sentence with its context: up to 'before' preceding and 'after' following sentences of its doc.
+
+        :param doc_id: id of the doc the sentence belongs to
+        :type doc_id: str
+        :param sent_id: id of the sentence
+        :type sent_id: int
+        :param before: max. number of preceding sentences
+        :type before: int
+        :param after: max. number of following sentences
+        :type after: int
+        :return: view of the rows of the window, ordered by sentence id
+        :rtype: pd.DataFrame
+        """
+
+        rows = self.doc_slice(doc_id)
+        pos = self.row(doc_id, sent_id)
+
+        return self.data.iloc[max(pos - before, rows.start):min(pos + after + 1, rows.stop)]
+
+    def doc_id_sent_id(self, row: int) -> str:
+        """
+        Get the 'doc_id|sent_id' id of the sentence of a row (the id used by hyperlinks and graphs).
+
+        :param row: row position of the sentence
+        :type row: int
+        :return: id of the doc and id of the sentence
+        :rtype: str
+        """
+
+        return f"{self.doc_ids[self.doc_codes[row]]}|{self.sent_ids[row]}"
+
+    def title(self, doc_id: str) -> str:
+        """
+        Get the title of a doc.
+
+        :param doc_id: id of the doc
+        :type doc_id: str
+        :return: title of the doc
+        :rtype: str
+        """
+
+        return self.data["title"].iat[self.doc_slice(doc_id).start]
+
+    def doc_id_for_title(self, title: str) -> str:
+        """
+        Get the id of the doc with the given title.
+
+        :param title: title of the doc
+        :type title: str
+        :return: id of the doc
+        :rtype: str
+        """
+
+        return self._title_to_doc_id[title]
+
+
+class CorpusStore:
+    """
+    Holder of the current version of the corpus, refreshed in the background.
+
+    The first call to 'get' loads the corpus. Afterwards, 'get' always returns the current corpus at once,
+    and starts a background refresh when it is older than 'ttl' seconds. A refreshed corpus replaces the
+    current one in a single assignment, so readers see either the previous or the new version.
+    """
+
+    def __init__(self, load: Callable[[Optional[Corpus]], Corpus], ttl: float):
+        """
+        :param load: function that loads the corpus, given its previous version (None on the first load)
+        :type load: Callable[[Optional[Corpus]], Corpus]
+        :param ttl: seconds after which the corpus is refreshed
+        :type ttl: float
+        """
+
+        self.ttl = ttl
+        self._load = load
+        self._corpus = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self) -> Corpus:
+        """
+        Get the current corpus, loading it on the first call and refreshing it in the background if stale.
+
+        :return: the current corpus
+        :rtype: Corpus
+        """
+
+        if self._corpus is None:
+            with self._lock:
+                if self._corpus is None:
+                    self._corpus = self._load(None)
+                    self._loaded_at = time.monotonic()
+        elif time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh()
+
+        return self._corpus
+
+    def refresh(self):
+        """
+        Start a background refresh of the corpus, unless one is already running.
+        """
+
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        threading.Thread(target=self._refresh, name="corpus-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self._corpus = self._load(self._corpus)
+        except Exception:
+            logger.exception("Corpus refresh failed, keeping the current version")
+        finally:
+            self._loaded_at = time.monotonic()  # after a failure, retry once the TTL expires again
+            self._refreshing = False
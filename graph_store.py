@@ -0,0 +1,126 @@
+"""
+On-disk store of precomputed graphs (the serialized links' graph of every linked sentence), so the app
+can serve graphs without building them on the request path. Build it from a corpus snapshot with:
+
+    python graph_store.py <snapshot_dir> <store_file> [--workers N]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import numpy as np
+
+_worker_graph = None
+
+
+class GraphStore:
+    """
+    Read-only access to a SQLite file with the serialized graphs, keyed by 'doc_id|sent_id'. The file records
+    the version of the corpus it was built from, so graphs of an outdated corpus are never served.
+    """
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()  # the connection is shared by all sessions
+        self.version = self._connection.execute("SELECT value FROM meta WHERE name = 'corpus_version'").fetchone()[0]
+
+    def get(self, doc_id_sent_id: str) -> Optional[str]:
+        """
+        Get the serialized graph of a sentence.
+
+        :param doc_id_sent_id: id of the doc and id of the sent
+        :type doc_id_sent_id: str
+        :return: the serialized graph, or None if it wasn't precomputed (or can't be read)
+        :rtype: Optional[str]
+        """
+
+        try:
+            with self._lock:
+                row = self._connection.execute("SELECT payload FROM graphs WHERE key = ?",
+                                               (doc_id_sent_id,)).fetchone()
+        except sqlite3.Error:
+            return None
+
+        return row[0] if row else None
+
+
+def write_graph_store(path: str, corpus_version: str, graphs: Iterable[Tuple[str, str]]):
+    """
+    Write a graph store file. The file is written aside and moved into place when complete.
+
+    :param path: store file
+    :type path: str
+    :param corpus_version: version of the corpus the graphs were built from
+    :type corpus_version: str
+    :param graphs: (doc_id|sent_id, serialized graph) tuples
+    :type graphs: Iterable[Tuple[str, str]]
+    """
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    connection = sqlite3.connect(tmp_path)
+    with connection:
+        connection.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+        connection.execute("CREATE TABLE graphs (key TEXT PRIMARY KEY, payload TEXT) WITHOUT ROWID")
+        connection.execute("INSERT INTO meta VALUES ('corpus_version', ?)", (corpus_version,))
+        connection.executemany("INSERT INTO graphs VALUES (?, ?)", graphs)
+    connection.close()
+    os.replace(tmp_path, path)
+
+
+def _init_worker(snapshot_dir: str):
+    global _worker_graph
+    from app import Graph
+    from snapshot import load_snapshot
+
+    _worker_graph = Graph(load_snapshot(snapshot_dir))  # memory-mapped: workers share the snapshot's pages
+
+
+def _build_graphs(rows: np.ndarray) -> List[Tuple[str, str]]:
+    corpus = _worker_graph.corpus
+    graphs = []
+    for row in rows:
+        doc_id_sent_id = corpus.doc_id_sent_id(row)
+        graphs.append((doc_id_sent_id, _worker_graph.build_json(doc_id_sent_id)))
+
+    return graphs
+
+
+def precompute(snapshot_dir: str, path: str, workers: Optional[int] = None, chunk_size: int = 512):
+    """
+    Build the graph of every linked sentence of a corpus snapshot, in parallel, and write them to a graph
+    store file.
+
+    :param snapshot_dir: corpus snapshot directory
+    :type snapshot_dir: str
+    :param path: store file
+    :type path: str
+    :param workers: number of worker processes (defaults to the number of CPUs)
+    :type workers: Optional[int]
+    :param chunk_size: number of sentences built by a worker per task
+    :type chunk_size: int
+    """
+
+    from snapshot import load_snapshot
+
+    corpus = load_snapshot(snapshot_dir)
+    rows = np.flatnonzero(corpus.links.linked)
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(snapshot_dir,)) as executor:
+        graphs = (graph for chunk_graphs in executor.map(_build_graphs, chunks) for graph in chunk_graphs)
+        write_graph_store(path, corpus.version, graphs)
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute the graph of every linked sentence of the corpus.")
+    parser.add_argument("snapshot_dir", help="corpus snapshot directory (see 'snapshot.py')")
+    parser.add_argument("path", help="graph store file to write")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+
+    precompute(args.snapshot_dir, args.path, workers=args.workers)
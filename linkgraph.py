@@ -0,0 +1,241 @@
+"""
+Sentence-level link graph of the corpus, stored as CSR arrays, and the graph queries the app runs on it
+without building per-request graph objects.
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
+
+
+def expand_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Concatenate the ranges [start, start + count) of every (start, count) pair, vectorized.
+
+    :param starts: first position of every range
+    :type starts: np.ndarray
+    :param counts: length of every range
+    :type counts: np.ndarray
+    :return: positions of all the ranges, in order
+    :rtype: np.ndarray
+    """
+
+    counts = np.asarray(counts, dtype=np.int64)
+    ends = np.cumsum(counts)
+
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts) + np.repeat(starts, counts)
+
+
+class Expansion(NamedTuple):
+    """
+    Sentences reached by a graph expansion, in BFS order, with the link each one was reached through.
+    """
+
+    rows: np.ndarray
+    hops: np.ndarray
+    parents: np.ndarray
+    links: np.ndarray
+
+
+class LinkGraph:
+    """
+    Directed graph of links between sentences (rows of the corpus), in CSR form: the links of row i are the
+    positions indptr[i]:indptr[i + 1], and 'target' holds the row each link points to (-1 if the linked
+    sentence isn't in the corpus).
+
+    The reverse index lists the links pointing to every row: those of row i are the link positions
+    reverse_links[reverse_indptr[i]:reverse_indptr[i + 1]], grouped by relation and sorted by distance
+    within a relation.
+    """
+
+    def __init__(self, indptr: np.ndarray, target: np.ndarray, relation: np.ndarray, dist: np.ndarray):
+        self.indptr = indptr
+        self.target = target
+        self.relation = relation
+        self.dist = dist
+        self.sources = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(indptr))
+
+        resolved = np.flatnonzero(target >= 0)
+        self.reverse_links = resolved[np.lexsort((dist[resolved], relation[resolved], target[resolved]))]
+        self.reverse_indptr = np.searchsorted(target[self.reverse_links], np.arange(len(self) + 1))
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def edges(self) -> tuple:
+        """
+        Get the links whose target is in the corpus, as edge arrays.
+
+        :return: Tuple with the source rows, the relation codes and the target rows
+        :rtype: tuple
+        """
+
+        resolved = self.target >= 0
+
+        return self.sources[resolved], self.relation[resolved], self.target[resolved]
+
+    def incoming(self, row: int, top_k: Optional[int] = None,
+                 max_dist: Optional[float] = None) -> List[Tuple[int, np.ndarray]]:
+        """
+        Get the links pointing to a sentence, grouped by relation, in O(number of incoming links).
+
+        :param row: row of the sentence
+        :type row: int
+        :param top_k: max. number of links per relation (the closest ones), or None for all
+        :type top_k: Optional[int]
+        :param max_dist: max. distance of the links, or None for any
+        :type max_dist: Optional[float]
+        :return: list of (relation code, link positions) tuples, closest links first
+        :rtype: List[Tuple[int, np.ndarray]]
+        """
+
+        links = self.reverse_links[self.reverse_indptr[row]:self.reverse_indptr[row + 1]]
+        if max_dist is not None:
+            links = links[self.dist[links] <= max_dist]
+        relations = self.relation[links]
+        bounds = np.flatnonzero(np.r_[True, relations[1:] != relations[:-1], True]).tolist() if len(links) else [0]
+
+        return [(int(relations[lo]), links[lo:hi if top_k is None else min(hi, lo + top_k)])
+                for lo, hi in zip(bounds, bounds[1:])]
+
+    def expand(self, seeds: np.ndarray, hops: int, fanout: int, max_dist: float, max_nodes: int = 2000,
+               exclude: Optional[np.ndarray] = None) -> Expansion:
+        """
+        Expand the graph breadth-first from some sentences, following at most 'fanout' links per sentence
+        (the closest ones) with a distance up to 'max_dist'. Every sentence is reached once, through the
+        closest link found at the first hop it is reached.
+
+        :param seeds: rows to start from (hop 0)
+        :type seeds: np.ndarray
+        :param hops: number of hops to expand
+        :type hops: int
+        :param fanout: max. number of new sentences reached from a sentence
+        :type fanout: int
+        :param max_dist: max. distance of the links to follow
+        :type max_dist: float
+        :param max_nodes: max. number of sentences reached, besides the seeds
+        :type max_nodes: int
+        :param exclude: rows never reached (e.g. sentences already displayed)
+        :type exclude: Optional[np.ndarray]
+        :return: the reached sentences (seeds not included)
+        :rtype: Expansion
+        """
+
+        visited = np.zeros(len(self), dtype=bool)
+        visited[seeds] = True
+        if exclude is not None:
+            visited[exclude] = True
+
+        frontier = np.unique(seeds)
+        reached = []
+        budget = max_nodes
+        for hop in range(1, hops + 1):
+            if not len(frontier) or budget <= 0:
+                break
+
+            counts = self.indptr[frontier + 1] - self.indptr[frontier]
+            links = expand_ranges(self.indptr[frontier], counts)
+            parents = np.repeat(frontier, counts)
+            targets = self.target[links]
+            keep = (targets >= 0) & (self.dist[links] <= max_dist)
+            keep[keep] = ~visited[targets[keep]]
+            links, parents, targets = links[keep], parents[keep], targets[keep]
+
+            # Every new sentence is reached through its closest link
+            order = np.argsort(self.dist[links], kind="stable")
+            _, first = np.unique(targets[order], return_index=True)
+            links, parents, targets = links[order][first], parents[order][first], targets[order][first]
+
+            # Keep the 'fanout' closest new sentences of every parent
+            order = np.lexsort((self.dist[links], parents))
+            links, parents, targets = links[order], parents[order], targets[order]
+            group_starts = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+            ranks = np.arange(len(parents)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(parents)]))
+            keep = ranks < fanout
+            links, parents, targets = links[keep][:budget], parents[keep][:budget], targets[keep][:budget]
+
+            visited[targets] = True
+            reached.append((targets, np.full(len(targets), hop), parents, links))
+            budget -= len(targets)
+            frontier = targets
+
+        if not reached:
+            empty = np.empty(0, dtype=np.int64)
+            return Expansion(empty, empty, empty, empty)
+
+        return Expansion(*(np.concatenate(columns) for columns in zip(*reached)))
+
+    def shortest_path(self, sources: np.ndarray, targets: np.ndarray, max_hops: int = 8) -> Optional[np.ndarray]:
+        """
+        Find a shortest chain of links from any of the source rows to any of the target rows (e.g. from a
+        sentence to a document), by bidirectional BFS: the side with fewer links to follow is expanded one
+        level at a time, forward along the links and backward along the reverse index.
+
+        :param sources: rows to start from
+        :type sources: np.ndarray
+        :param targets: rows to reach
+        :type targets: np.ndarray
+        :param max_hops: max. number of links of the chain
+        :type max_hops: int
+        :return: positions of the links of the chain, in order (empty if a source is a target), or None if
+            no chain of at most 'max_hops' links exists
+        :rtype: Optional[np.ndarray]
+        """
+
+        sources, targets = np.unique(sources), np.unique(targets)
+        if len(np.intersect1d(sources, targets)):
+            return np.empty(0, dtype=np.int64)
+
+        # Link through which every row was reached from the sources / leaves towards the targets (-1: not
+        # reached, -2: source / target), and its distance in links
+        forward, backward = np.full(len(self), -1, dtype=np.int64), np.full(len(self), -1, dtype=np.int64)
+        forward_hops, backward_hops = np.zeros(len(self), dtype=np.int32), np.zeros(len(self), dtype=np.int32)
+        forward[sources], backward[targets] = -2, -2
+        forward_frontier, backward_frontier = sources, targets
+        forward_depth = backward_depth = 0
+
+        meet = None
+        while meet is None and forward_depth + backward_depth < max_hops:
+            forward_counts = self.indptr[forward_frontier + 1] - self.indptr[forward_frontier]
+            backward_counts = (self.reverse_indptr[backward_frontier + 1] - self.reverse_indptr[backward_frontier])
+            if not forward_counts.sum() or not backward_counts.sum():
+                return None
+
+            if forward_counts.sum() <= backward_counts.sum():
+                links = expand_ranges(self.indptr[forward_frontier], forward_counts)
+                reached = self.target[links]
+                keep = reached >= 0
+                keep[keep] = forward[reached[keep]] == -1
+                reached, first = np.unique(reached[keep], return_index=True)
+                forward_depth += 1
+                forward[reached], forward_hops[reached] = links[keep][first], forward_depth
+                forward_frontier = reached
+                met = reached[backward[reached] != -1]
+                if len(met):
+                    meet = met[np.argmin(backward_hops[met])]
+            else:
+                links = self.reverse_links[expand_ranges(self.reverse_indptr[backward_frontier], backward_counts)]
+                reached = self.sources[links].astype(np.int64)
+                keep = backward[reached] == -1
+                reached, first = np.unique(reached[keep], return_index=True)
+                backward_depth += 1
+                backward[reached], backward_hops[reached] = links[keep][first], backward_depth
+                backward_frontier = reached
+                met = reached[forward[reached] != -1]
+                if len(met):
+                    meet = met[np.argmin(forward_hops[met])]
+
+        if meet is None:
+            return None
+
+        chain = []
+        row = meet
+        while forward[row] >= 0:
+            chain.append(forward[row])
+            row = self.sources[forward[row]]
+        chain.reverse()
+        row = meet
+        while backward[row] >= 0:
+            chain.append(backward[row])
+            row = self.target[backward[row]]
+
+        return np.array(chain, dtype=np.int64)
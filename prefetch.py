@@ -0,0 +1,77 @@
+"""
+Background prefetching: warm-up jobs (e.g. rendering the docs a user is likely to open next) run by a small
+pool of threads, so the caches are filled before the user asks for them.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Hashable
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Pool of daemon threads that run jobs from a bounded queue. Prefetching is only a hint: when the queue is
+    full, new jobs are dropped instead of blocking the caller, and a job whose key is queued, running or among
+    the last 'remember' done is not submitted again.
+    """
+
+    def __init__(self, workers: int = 2, maxsize: int = 64, remember: int = 1024):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._pending = set()
+        self._done = OrderedDict()  # keys of the last jobs done, as an LRU set
+        self._remember = remember
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"prefetch-{i}", daemon=True).start()
+
+    def submit(self, key: Hashable, job: Callable[[], None]) -> bool:
+        """
+        Queue a job, unless the queue is full or a job with the same key is pending or was done recently.
+
+        :param key: key of the job
+        :type key: Hashable
+        :param job: function to run in the background
+        :type job: Callable[[], None]
+        :return: True if the job was queued
+        :rtype: bool
+        """
+
+        with self._lock:
+            if key in self._pending:
+                return False
+            if key in self._done:
+                self._done.move_to_end(key)
+                return False
+            try:
+                self._queue.put_nowait((key, job))
+            except queue.Full:
+                return False
+            self._pending.add(key)
+
+        return True
+
+    def join(self):
+        """
+        Wait until all the queued jobs are done.
+        """
+
+        self._queue.join()
+
+    def _work(self):
+        while True:
+            key, job = self._queue.get()
+            try:
+                job()
+            except Exception:
+                logger.exception("Prefetch job %r failed", key)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                    self._done[key] = None
+                    if len(self._done) > self._remember:
+                        self._done.popitem(last=False)
+                self._queue.task_done()
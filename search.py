@@ -0,0 +1,276 @@
+"""
+Full-text search over the sentences of the corpus: an inverted index of the words of every sentence and of
+every document title, with ranked term and prefix search. Build it offline from a corpus snapshot with:
+
+    python search.py <snapshot_dir> <index_dir>
+"""
+
+from bisect import bisect_left
+from corpus import Corpus
+from linkgraph import expand_ranges
+from storage import publish_dir, read_tables, write_table
+from typing import List, Tuple
+import fcntl
+import os
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+TOKEN = re.compile(r"\w+")
+SENT_FILE = "sent.arrow"
+TITLE_FILE = "title.arrow"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase words.
+
+    :param text: text to split
+    :type text: str
+    :return: words of the text
+    :rtype: List[str]
+    """
+
+    return TOKEN.findall(text.lower())
+
+
+class TermIndex:
+    """
+    Inverted index in CSR form: 'terms' are sorted, and the postings of terms[t] (ids of the texts that
+    contain it, ascending, and the number of times they do) are the positions offsets[t]:offsets[t + 1] of
+    'ids' and 'tf'.
+    """
+
+    def __init__(self, terms: List[str], offsets: np.ndarray, ids: np.ndarray, tf: np.ndarray, num_ids: int):
+        self.terms = terms
+        self.offsets = offsets
+        self.ids = ids
+        self.tf = tf
+        self.num_ids = num_ids
+
+        # Number of words of every text, for the length normalization of the scores
+        self.lengths = np.bincount(ids, weights=tf, minlength=num_ids)
+        self.avg_length = max(self.lengths.mean(), 1.0) if num_ids else 1.0
+
+    @classmethod
+    def build(cls, texts: pd.Series) -> "TermIndex":
+        """
+        Index texts, in a single vectorized pass. Ids are the positions of the texts.
+
+        :param texts: texts to index
+        :type texts: pd.Series
+        :return: the index
+        :rtype: TermIndex
+        """
+
+        tokens = pd.Series(texts.to_numpy(dtype=object)).str.lower().str.findall(TOKEN.pattern).explode().dropna()
+        term_codes, terms = pd.factorize(tokens.to_numpy(dtype=object))
+        order = np.argsort(terms.astype(str))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        # (term, id) pairs sorted by term, then id, with their counts
+        keys, tf = np.unique(rank[term_codes] * len(texts) + tokens.index.to_numpy(), return_counts=True)
+        term_ids = keys // max(len(texts), 1)
+
+        return cls(
+            terms=terms[order].astype(str).tolist(),
+            offsets=np.searchsorted(term_ids, np.arange(len(order) + 1)),
+            ids=(keys % max(len(texts), 1)).astype(np.int32),
+            tf=np.minimum(tf, np.iinfo(np.uint16).max).astype(np.uint16),
+            num_ids=len(texts)
+        )
+
+    def lookup(self, word: str, prefix: bool = False, max_terms: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the texts that contain a word (or a word starting with it), and score them with BM25.
+
+        :param word: word to look up, lowercase
+        :type word: str
+        :param prefix: match the terms that start with the word
+        :type prefix: bool
+        :param max_terms: max. number of terms a prefix expands to (the most frequent ones)
+        :type max_terms: int
+        :return: Tuple with the ids of the matching texts (ascending) and their scores
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+
+        first = bisect_left(self.terms, word)
+        last = bisect_left(self.terms, word + "\U0010ffff") if prefix else first + 1
+        if first == len(self.terms) or (not prefix and self.terms[first] != word):
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        terms = np.arange(first, min(last, len(self.terms)))
+        df = self.offsets[terms + 1] - self.offsets[terms]
+        if len(terms) > max_terms:
+            keep = np.sort(np.argsort(-df, kind="stable")[:max_terms])
+            terms, df = terms[keep], df[keep]
+
+        positions = expand_ranges(self.offsets[terms], df)
+        ids, tf = self.ids[positions], self.tf[positions].astype(np.float64)
+        idf = np.repeat(np.log(1 + (self.num_ids - df + 0.5) / (df + 0.5)), df)
+        k1, b = 1.2, 0.75
+        scores = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * self.lengths[ids] / self.avg_length))
+
+        if len(terms) == 1:
+            return ids, scores
+
+        # A text may match several terms of a prefix: keep its best score
+        best = np.zeros(self.num_ids)
+        np.maximum.at(best, ids, scores)
+        ids = np.flatnonzero(best).astype(np.int32)
+
+        return ids, best[ids]
+
+    def to_table(self, version: str) -> pa.Table:
+        postings = pa.LargeListArray.from_arrays(self.offsets, pa.StructArray.from_arrays(
+            [pa.array(self.ids), pa.array(self.tf)], names=["id", "tf"]
+        ))
+        return pa.table(
+            {"term": pa.array(self.terms, type=pa.large_string()), "postings": postings},
+            metadata={"version": version, "num_ids": str(self.num_ids)}
+        )
+
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "TermIndex":
+        postings = table.column("postings").combine_chunks()
+        return cls(
+            terms=table.column("term").to_pylist(),
+            offsets=postings.offsets.to_numpy(zero_copy_only=True),
+            ids=postings.values.field("id").to_numpy(zero_copy_only=True),
+            tf=postings.values.field("tf").to_numpy(zero_copy_only=True),
+            num_ids=int(table.schema.metadata[b"num_ids"])
+        )
+
+
+class SearchIndex:
+    """
+    Search index of a corpus: one index of the sentences (ids are rows) and one of the document titles
+    (ids are doc codes, in corpus order).
+    """
+
+    def __init__(self, version: str, sents: TermIndex, titles: TermIndex, doc_offsets: np.ndarray):
+        self.version = version
+        self.sents = sents
+        self.titles = titles
+        self.doc_offsets = doc_offsets
+
+    @classmethod
+    def build(cls, corpus: Corpus) -> "SearchIndex":
+        """
+        Index the sentences and the document titles of a corpus.
+
+        :param corpus: corpus to index
+        :type corpus: Corpus
+        :return: the index
+        :rtype: SearchIndex
+        """
+
+        doc_titles = corpus.data["title"].iloc[corpus.doc_offsets[:-1]]
+
+        return cls(corpus.version, TermIndex.build(corpus.data["sent"]), TermIndex.build(doc_titles),
+                   corpus.doc_offsets)
+
+    def search(self, query: str, k: int = 10, title_boost: float = 2.0) -> List[Tuple[int, float]]:
+        """
+        Find the sentences that contain every word of a query, either in the sentence or in the title of its
+        document. The last word also matches as a prefix, so results show up while typing. Sentences are
+        ranked by BM25 score, with title matches weighted by 'title_boost'.
+
+        :param query: words to search
+        :type query: str
+        :param k: max. number of results
+        :type k: int
+        :param title_boost: weight of the title matches
+        :type title_boost: float
+        :return: list of (row, score) tuples, best first
+        :rtype: List[Tuple[int, float]]
+        """
+
+        words = tokenize(query)
+        if not words:
+            return []
+
+        scores = np.zeros(self.sents.num_ids)
+        matched = np.zeros(self.sents.num_ids, dtype=np.int32)
+        for i, word in enumerate(words):
+            prefix = i == len(words) - 1 and not query[-1:].isspace()
+            sent_rows, sent_scores = self.sents.lookup(word, prefix=prefix)
+            docs, doc_scores = self.titles.lookup(word, prefix=prefix)
+            counts = self.doc_offsets[docs + 1] - self.doc_offsets[docs]
+            title_rows = expand_ranges(self.doc_offsets[docs], counts)
+            if not len(sent_rows) and not len(title_rows):
+                return []
+
+            # Score of the word for every sentence that matches it, in the sentence or the title (rows are
+            # unique within each lookup, so the scores can be added without np.add.at)
+            word_scores = np.zeros(self.sents.num_ids)
+            word_scores[sent_rows] += sent_scores
+            word_scores[title_rows] += title_boost * np.repeat(doc_scores, counts)
+            scores += word_scores
+            matched += word_scores > 0
+
+        rows = np.flatnonzero(matched == len(words))
+        scores = scores[rows]
+        top = np.argpartition(-scores, k - 1)[:k] if len(rows) > k else np.arange(len(rows))
+        top = top[np.lexsort((rows[top], -scores[top]))]  # best first, then in corpus order
+
+        return list(zip(rows[top].tolist(), scores[top].tolist()))
+
+
+def save_index(index: SearchIndex, path: str):
+    """
+    Write a search index to a directory, as memory-mappable Arrow files. The index is written aside and
+    published atomically (see 'storage.publish_dir').
+
+    :param index: index to save
+    :type index: SearchIndex
+    :param path: index directory
+    :type path: str
+    """
+
+    def write(index_path: str):
+        for file, term_index in [(SENT_FILE, index.sents), (TITLE_FILE, index.titles)]:
+            write_table(term_index.to_table(index.version), os.path.join(index_path, file))
+
+    publish_dir(path, write)
+
+
+def load_index(path: str, corpus: Corpus) -> SearchIndex:
+    """
+    Read the search index of a corpus from a directory. If the index is missing or was built from another
+    version of the corpus, it is built and saved, by one process at a time (the others then read it).
+
+    :param path: index directory
+    :type path: str
+    :param corpus: corpus the index must match
+    :type corpus: Corpus
+    :return: the index
+    :rtype: SearchIndex
+    """
+
+    with open(f"{path.rstrip(os.sep)}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # one process at a time checks the index, or builds it
+        if os.path.exists(os.path.join(path, SENT_FILE)):
+            tables = read_tables(path, [SENT_FILE, TITLE_FILE])
+            if tables[0].schema.metadata[b"version"].decode() == corpus.version:
+                return SearchIndex(corpus.version, *map(TermIndex.from_table, tables), corpus.doc_offsets)
+
+        index = SearchIndex.build(corpus)
+        save_index(index, path)
+
+    return index
+
+
+if __name__ == "__main__":
+
+    import argparse
+    from snapshot import load_snapshot
+
+    parser = argparse.ArgumentParser(description="Build the search index of the corpus.")
+    parser.add_argument("snapshot_dir", help="corpus snapshot directory (see 'snapshot.py')")
+    parser.add_argument("path", help="search index directory to write")
+    args = parser.parse_args()
+
+    save_index(SearchIndex.build(load_snapshot(args.snapshot_dir)), args.path)
@@ -0,0 +1,139 @@
+"""
+Local columnar snapshot of the corpus, stored as Arrow IPC files that are memory-mapped when read, so
+the app can start without reading GSheets and several server processes share the same pages.
+
+Sync the snapshot from GSheets with:
+
+    python snapshot.py <snapshot_dir>
+"""
+
+import fcntl
+import json
+import os
+from corpus import Corpus, LinkTable
+from storage import publish_dir, read_tables, write_table
+from typing import Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+SENTENCES_FILE = "sentences.arrow"
+LINKS_FILE = "links.arrow"
+
+
+def _to_numpy(table: pa.Table, column: str) -> np.ndarray:
+    return table.column(column).combine_chunks().to_numpy(zero_copy_only=True)
+
+
+def save_snapshot(corpus: Corpus, path: str):
+    """
+    Write the corpus to a snapshot directory. The new snapshot is written aside and published atomically
+    (see 'storage.publish_dir'), so readers never see a missing or half-written snapshot.
+
+    :param corpus: corpus to save
+    :type corpus: Corpus
+    :param path: snapshot directory
+    :type path: str
+    """
+
+    links = corpus.links
+
+    sentences = pa.Table.from_pandas(corpus.data, preserve_index=False)
+    sentences = sentences.append_column("linked", pa.array(links.linked))
+    sentences = sentences.append_column("link_count", pa.array(np.diff(links.offsets)))
+    sentences = sentences.append_column("row_hash", pa.array(corpus.row_hashes))
+
+    keywords = pa.DictionaryArray.from_arrays(links.keyword_code, pa.array(links.vocabulary, type=pa.string()))
+    links_table = pa.table(
+        {
+            "relation": links.relation,
+            "target_doc": links.target_doc,
+            "target_sent": links.target_sent,
+            "dist": links.dist,
+            "keyword": keywords
+        },
+        metadata={"relations": json.dumps(links.relations), "doc_ids": json.dumps(links.doc_ids)}
+    )
+
+    def write(snapshot_path: str):
+        write_table(sentences, os.path.join(snapshot_path, SENTENCES_FILE))
+        write_table(links_table, os.path.join(snapshot_path, LINKS_FILE))
+
+    publish_dir(path, write)
+
+
+def load_snapshot(path: str, previous: Optional[Corpus] = None) -> Corpus:
+    """
+    Read the corpus from a snapshot directory. Link arrays are zero-copy views of the memory-mapped files,
+    and text columns are backed by Arrow memory.
+
+    :param path: snapshot directory
+    :type path: str
+    :param previous: previous version of the corpus, returned as is if the snapshot has the same rows
+    :type previous: Optional[Corpus]
+    :return: the corpus
+    :rtype: Corpus
+    """
+
+    sentences, links_table = read_tables(path, [SENTENCES_FILE, LINKS_FILE])
+    row_hashes = _to_numpy(sentences, "row_hash")
+    if previous is not None and np.array_equal(row_hashes, previous.row_hashes):
+        return previous
+
+    metadata = links_table.schema.metadata
+
+    keywords = links_table.column("keyword").combine_chunks()
+    links = LinkTable(
+        offsets=np.concatenate(([0], np.cumsum(_to_numpy(sentences, "link_count")))),
+        linked=sentences.column("linked").to_numpy(),
+        relation=_to_numpy(links_table, "relation"),
+        target_doc=_to_numpy(links_table, "target_doc"),
+        target_sent=_to_numpy(links_table, "target_sent"),
+        dist=_to_numpy(links_table, "dist"),
+        keyword_code=keywords.indices.to_numpy(zero_copy_only=True),
+        relations=json.loads(metadata[b"relations"]),
+        doc_ids=json.loads(metadata[b"doc_ids"]),
+        vocabulary=keywords.dictionary.to_pylist()
+    )
+
+    data = sentences.drop_columns(["linked", "link_count", "row_hash"]).to_pandas(
+        types_mapper={pa.string(): pd.ArrowDtype(pa.string()), pa.large_string(): pd.ArrowDtype(pa.large_string())}.get
+    )
+
+    return Corpus(data, links, row_hashes)
+
+
+def share_snapshot(corpus: Corpus, path: str) -> Corpus:
+    """
+    Publish a corpus as a snapshot in a shared directory (e.g. under '/dev/shm') and return the memory-mapped
+    copy, so server processes that load the same corpus share its pages instead of each holding a copy.
+
+    :param corpus: corpus to share
+    :type corpus: Corpus
+    :param path: shared snapshot directory
+    :type path: str
+    :return: the memory-mapped corpus
+    :rtype: Corpus
+    """
+
+    with open(f"{path.rstrip(os.sep)}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # one process at a time publishes or checks the shared snapshot
+        if os.path.exists(path):
+            shared = load_snapshot(path)
+            if shared.version == corpus.version:
+                return shared  # already published by another process
+        save_snapshot(corpus, path)
+
+    return load_snapshot(path)
+
+
+if __name__ == "__main__":
+
+    import argparse
+    from app import read_sheet
+
+    parser = argparse.ArgumentParser(description="Sync the local corpus snapshot from GSheets.")
+    parser.add_argument("path", help="snapshot directory")
+    args = parser.parse_args()
+
+    save_snapshot(Corpus.from_sheet(read_sheet()), args.path)
@@ -0,0 +1,107 @@
+"""
+On-disk helpers shared by the corpus snapshot and the search index: memory-mappable Arrow files, and
+directories of them published atomically.
+"""
+
+from typing import Callable, List, Optional
+import fcntl
+import glob
+import os
+import re
+import shutil
+import time
+import pyarrow as pa
+
+
+def write_table(table: pa.Table, path: str):
+    """
+    Write a table to an Arrow IPC file, in a single chunk so every column maps to one buffer.
+
+    :param table: table to write
+    :type table: pa.Table
+    :param path: file to write
+    :type path: str
+    """
+
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(table), 1))
+
+
+def read_table(path: str) -> pa.Table:
+    """
+    Read a table from an Arrow IPC file, memory-mapped.
+
+    :param path: file to read
+    :type path: str
+    :return: the table
+    :rtype: pa.Table
+    """
+
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def read_tables(path: str, files: List[str]) -> List[pa.Table]:
+    """
+    Read tables from the files of a directory published with 'publish_dir', all from the same version. If
+    that version is removed while it is being read (two newer ones were published), the current one is read.
+
+    :param path: published directory
+    :type path: str
+    :param files: names of the files to read
+    :type files: List[str]
+    :return: the tables, memory-mapped
+    :rtype: List[pa.Table]
+    """
+
+    while True:
+        version_path = os.path.realpath(path)
+        try:
+            return [read_table(os.path.join(version_path, file)) for file in files]
+        except FileNotFoundError:
+            if os.path.realpath(path) == version_path:
+                raise
+
+
+def publish_dir(path: str, write: Callable[[str], None]):
+    """
+    Write a directory and publish it at 'path' atomically. The files are written aside, then moved to a new
+    versioned directory next to it ('<path>.v-<time>-<pid>'), and 'path' is a symlink that is swapped to it
+    with a rename, so readers always find a complete directory. Publishing is serialized across processes
+    with a lock file ('<path>.publish.lock'), so versions are numbered in publishing order; the version being
+    replaced is kept, as a reader may still be opening its files, and only older ones are removed. Read its
+    files with 'read_tables'.
+
+    :param path: directory to publish
+    :type path: str
+    :param write: function that writes the files into the directory it is given
+    :type write: Callable[[str], None]
+    """
+
+    path = path.rstrip(os.sep)
+    staging_path = f"{path}.tmp-{time.time_ns()}-{os.getpid()}"
+    os.makedirs(staging_path)
+    write(staging_path)
+
+    with open(f"{path}.publish.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        version_path = f"{path}.v-{time.time_ns()}-{os.getpid()}"
+        os.rename(staging_path, version_path)
+        previous = _version(os.readlink(path)) if os.path.islink(path) else None
+
+        link_path = f"{path}.link-{os.getpid()}"
+        os.symlink(os.path.basename(version_path), link_path)
+        os.replace(link_path, path)
+
+        if previous is not None:
+            for old_path in glob.glob(f"{glob.escape(path)}.v-*"):
+                version = _version(old_path)
+                if version is not None and version < previous:
+                    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _version(version_path: str) -> Optional[int]:
+    # Publishing time of a versioned directory, from its name
+    match = re.search(r"\.v-(\d+)-\d+$", version_path)
+
+    return int(match.group(1)) if match else None
@@ -8,6 +8,7 @@ import streamlit as st
 
 from streamlit_agraph import data
 
+from streamlit_agraph.compact import decode_graph, encode_elements, encode_graph
 from streamlit_agraph.config import Config, ConfigBuilder
 from streamlit_agraph.triple import Triple
 from streamlit_agraph.node import Node
@@ -26,18 +27,91 @@ else:
         url="http://localhost:3001",
     )
       
-def agraph(nodes, edges, config):
+def graph_to_json(nodes, edges, compact=False):
+    """
+    Serialize nodes and edges to the payload rendered by 'agraph_from_json' (can be cached and reused).
+    With 'compact', the payload is columnar and the styles shared by several elements are sent once.
+    """
     node_ids = [node.id for node in nodes]
     if len(node_ids) > len(set(node_ids)):
         st.warning("Duplicated node IDs exist.")
     nodes_data = [ node.to_dict() for node in nodes]
     edges_data = [ edge.to_dict() for edge in edges]
-    config_json = json.dumps(config.__dict__)
     data = { "nodes": nodes_data, "edges": edges_data}
-    data_json = json.dumps(data)
-    component_value = _agraph(data=data_json, config=config_json)
+    if compact:
+        return json.dumps(encode_graph(data), separators=(",", ":"))
+    return json.dumps(data)
+
+def _edge_id(edge_data):
+    if "id" in edge_data:
+        return edge_data["id"]
+    return json.dumps([edge_data.get("from"), edge_data.get("to"), edge_data.get("label"), edge_data.get("title")])
+
+def graph_delta(graph_id, data):
+    """
+    Diff a graph payload ('nodes' and 'edges' dicts) against the graph last sent for 'graph_id' in this
+    session, and record it as the new state. Returns the changes to apply: nodes and edges to add or update,
+    ids to remove, and the revision they turn 'base' into ('base' is None when the whole graph is sent).
+    """
+    state_key = f"_agraph_{graph_id}"
+    state = st.session_state.get(state_key)
+    nodes = {node["id"]: node for node in data["nodes"]}
+    edges = {}
+    for edge in data["edges"]:
+        edge_id = _edge_id(edge)
+        edges[edge_id] = dict(edge, id=edge_id)
+
+    if state is None:
+        delta = {"base": None, "revision": 0, "nodes": list(nodes.values()), "edges": list(edges.values()),
+                 "remove_nodes": [], "remove_edges": []}
+    else:
+        delta = {
+            "nodes": [node for node_id, node in nodes.items() if state["nodes"].get(node_id) != node],
+            "edges": [edge for edge_id, edge in edges.items() if state["edges"].get(edge_id) != edge],
+            "remove_nodes": [node_id for node_id in state["nodes"] if node_id not in nodes],
+            "remove_edges": [edge_id for edge_id in state["edges"] if edge_id not in edges],
+        }
+        changed = any(delta.values())
+        delta["base"] = state["revision"]
+        delta["revision"] = state["revision"] + 1 if changed else state["revision"]
+
+    st.session_state[state_key] = {"revision": delta["revision"], "nodes": nodes, "edges": edges}
+    return delta
+
+def agraph_from_json(data_json, config, graph_id=None):
+    """
+    Render a serialized graph. With a 'graph_id', the component keeps its network between reruns and only
+    the nodes and edges that changed since the last rerun are sent to it, so the layout stays in place.
+    """
+    config_json = json.dumps(config.__dict__)
+    if graph_id is None:
+        component_value = _agraph(data=data_json, config=config_json)
+        return component_value
+
+    data = json.loads(data_json)
+    delta = graph_delta(graph_id, decode_graph(data))
+    if data.get("format") == "columns":
+        delta["nodes"], delta["edges"] = encode_elements(delta["nodes"]), encode_elements(delta["edges"])
+    delta_json = json.dumps(delta, separators=(",", ":"))
+    component_value = _agraph(data=None, delta=delta_json, config=config_json, key=f"agraph_{graph_id}")
+    if isinstance(component_value, dict) and "resync" in component_value:
+        # The component lost its network (e.g. it was remounted): send the whole graph on the next rerun
+        resync_key = f"_agraph_{graph_id}_resync"
+        if st.session_state.get(resync_key) != component_value["resync"]:
+            st.session_state[resync_key] = component_value["resync"]
+            del st.session_state[f"_agraph_{graph_id}"]
+            st.rerun()
+        return None
     return component_value
 
+def forget_graph(graph_id):
+    """Drop the state kept in this session for the graph 'graph_id' (see 'agraph_from_json')."""
+    st.session_state.pop(f"_agraph_{graph_id}", None)
+    st.session_state.pop(f"_agraph_{graph_id}_resync", None)
+
+def agraph(nodes, edges, config, graph_id=None, compact=False):
+    return agraph_from_json(graph_to_json(nodes, edges, compact=compact), config, graph_id=graph_id)
+
 
 if not _RELEASE:
     st.set_page_config(layout="wide") # layout="wide"
@@ -1,34 +1,172 @@
-import networkx as nx
-from networkx.algorithms import community
+from functools import cached_property
+import numpy as np
+import pandas as pd
 from streamlit_agraph.triplestore import TripleStore
 
 class GraphAlgos:
-  def __init__(self, store:TripleStore):
-    self.node_names = [n.id for n in store.nodes_set]
-    self.edges = [(e.source, e.target) for e in store.edges_set]
-    G = nx.Graph()  # Initialize a Graph object
-    G.add_nodes_from(self.node_names)  # Add nodes to the Graph
-    G.add_edges_from(self.edges)  # Add edges to the Graph
-
-    self.G = G
+  """
+  Graph analytics (connected components, PageRank, communities, shortest paths) over an array-backed
+  graph: nodes are integers 0..num_nodes-1 and edges are two arrays of node ids, kept in CSR form.
+  Results are computed on first use and cached.
+  """
+  def __init__(self, store:TripleStore=None, src=None, dst=None, num_nodes=None, node_names=None):
+    if store is not None:
+      src, dst, node_names = store.to_arrays()
+      num_nodes = len(node_names)
+
+    self.src = np.asarray(src, dtype=np.int64)
+    self.dst = np.asarray(dst, dtype=np.int64)
+    self.num_nodes = int(num_nodes if num_nodes is not None else max(self.src.max(initial=-1), self.dst.max(initial=-1)) + 1)
+    self.node_names = node_names
+
+    # Undirected CSR (both directions of every edge, without self-loops)
+    loops = self.src == self.dst
+    u = np.concatenate((self.src[~loops], self.dst[~loops]))
+    v = np.concatenate((self.dst[~loops], self.src[~loops]))
+    order = np.argsort(u, kind="stable")
+    self.indices = v[order]
+    self.indptr = np.concatenate(([0], np.cumsum(np.bincount(u, minlength=self.num_nodes))))
+
     self.density = self.density()
-    # self.shortest_path() = self.shortest_path()
-    # self.find_communities = self.find_communities()
+
+  @classmethod
+  def from_edges(cls, src, dst, num_nodes=None, node_names=None):
+    return cls(src=src, dst=dst, num_nodes=num_nodes, node_names=node_names)
 
   def density(self):
-    return nx.density(self.G)
+    n = self.num_nodes
+    if n < 2:
+      return 0
+    u, v = np.minimum(self.src, self.dst), np.maximum(self.src, self.dst)
+    m = len(np.unique(u * n + v))  # unique undirected edges, like networkx.Graph
+    return 2 * m / (n * (n - 1))
+
+  def degree(self):
+    return np.diff(self.indptr)
+
+  @cached_property
+  def components(self):
+    """Connected component of every node (ignoring direction), numbered by decreasing size."""
+    labels = np.arange(self.num_nodes)
+    u, v = self.src, self.dst
+    while True:
+      # Hook the root of every edge end to the smaller root, then jump pointers to the roots
+      lu, lv = labels[u], labels[v]
+      hooked = labels.copy()
+      np.minimum.at(hooked, lu, np.minimum(lu, lv))
+      np.minimum.at(hooked, lv, np.minimum(lu, lv))
+      while True:
+        jumped = hooked[hooked]
+        if np.array_equal(jumped, hooked):
+          break
+        hooked = jumped
+      if np.array_equal(hooked, labels):
+        break
+      labels = hooked
+    return self._relabel_by_size(labels)
+
+  def pagerank(self, alpha=0.85, tol=1e-6, max_iter=100):
+    if (alpha, tol, max_iter) == (0.85, 1e-6, 100):
+      return self._pagerank
+    return self._compute_pagerank(alpha, tol, max_iter)
+
+  @cached_property
+  def _pagerank(self):
+    return self._compute_pagerank(0.85, 1e-6, 100)
+
+  def _compute_pagerank(self, alpha, tol, max_iter):
+    n = self.num_nodes
+    if n == 0:
+      return np.empty(0)
+    out_degree = np.bincount(self.src, minlength=n)
+    dangling = out_degree == 0
+    weights = 1 / out_degree[self.src] if len(self.src) else np.empty(0)
+    rank = np.full(n, 1 / n)
+    for _ in range(max_iter):
+      new_rank = np.bincount(self.dst, weights=rank[self.src] * weights, minlength=n)
+      new_rank = alpha * (new_rank + rank[dangling].sum() / n) + (1 - alpha) / n
+      converged = np.abs(new_rank - rank).sum() < n * tol
+      rank = new_rank
+      if converged:
+        break
+    return rank
+
+  @cached_property
+  def communities(self):
+    """Community of every node (label propagation, ignoring direction), numbered by decreasing size."""
+    n = self.num_nodes
+    labels = np.arange(n)
+    node = np.repeat(np.arange(n), self.degree())
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+      # Most frequent label among the neighbors of every node (ties: smallest label)
+      keys = np.sort(node * n + labels[self.indices])
+      if not len(keys):
+        break
+      run_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+      counts = np.diff(np.r_[run_starts, len(keys)])
+      run_nodes, run_labels = keys[run_starts] // n, keys[run_starts] % n
+      node_starts = np.flatnonzero(np.r_[True, run_nodes[1:] != run_nodes[:-1]])
+      max_counts = np.maximum.reduceat(counts, node_starts)
+      best_runs = np.flatnonzero(counts == np.repeat(max_counts, np.diff(np.r_[node_starts, len(counts)])))
+      best_runs = best_runs[np.r_[True, run_nodes[best_runs][1:] != run_nodes[best_runs][:-1]]]
+      best = labels.copy()
+      best[run_nodes[best_runs]] = run_labels[best_runs]
+      # Update half of the nodes at a time, so labels don't oscillate between neighbors; stop when
+      # (almost) every node already has its best label
+      if np.count_nonzero(best != labels) <= n // 1000:
+        break
+      labels = np.where(rng.random(n) < 0.5, best, labels)
+    return self._relabel_by_size(labels)
+
+  def find_communities(self, min_size=2):
+    """Communities as lists of node names (or ids), largest first."""
+    sizes = np.bincount(self.communities)
+    order = np.argsort(self.communities, kind="stable")
+    groups = np.split(order, np.cumsum(sizes)[:-1])
+    return [self._names(group) for group in groups if len(group) >= min_size]
+
+  def hubs(self, k=10):
+    """Ids of the k nodes with the highest PageRank."""
+    rank = self.pagerank()
+    k = min(k, len(rank))
+    top = np.argpartition(-rank, k - 1)[:k] if k else np.empty(0, dtype=np.int64)
+    return top[np.argsort(-rank[top], kind="stable")]
 
   def shortest_path(self, source, target):
-    try:
-      sp = nx.shortest_path(self.G, source=source, target=target)
-    except nx.NetworkXNoPath:
-      return  []
-    else:
-      return sp
-
-  def find_communities(self) -> str:
-    # print(nx.info(G))  # Print information about the Graph
-    return "hello community"
-
-  # def parse_node(*args):
-  #  nodes_data = [{"id": f"{node}"} for node in nodes]
\ No newline at end of file
+    """Shortest path (ignoring direction) between two nodes, as a list of node names (or ids)."""
+    if self.node_names is not None:
+      source, target = pd.Index(self.node_names).get_indexer([source, target])
+      if source < 0 or target < 0:
+        return []
+    parents = np.full(self.num_nodes, -1)
+    parents[source] = source
+    frontier = np.array([source])
+    while len(frontier) and parents[target] < 0:
+      counts = self.indptr[frontier + 1] - self.indptr[frontier]
+      starts = np.repeat(self.indptr[frontier] - np.cumsum(counts) + counts, counts)
+      neighbors = self.indices[np.arange(counts.sum()) + starts]
+      froms = np.repeat(frontier, counts)
+      new = parents[neighbors] < 0
+      neighbors, froms = neighbors[new], froms[new]
+      neighbors, first = np.unique(neighbors, return_index=True)
+      parents[neighbors] = froms[first]
+      frontier = neighbors
+    if parents[target] < 0:
+      return []
+    path = [target]
+    while path[-1] != source:
+      path.append(int(parents[path[-1]]))
+    return self._names(path[::-1])
+
+  def _names(self, ids):
+    if self.node_names is None:
+      return [int(i) for i in ids]
+    return [self.node_names[i] for i in ids]
+
+  @staticmethod
+  def _relabel_by_size(labels):
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(counts), dtype=np.int64)
+    rank[np.argsort(-counts, kind="stable")] = np.arange(len(counts))
+    return rank[inverse]
@@ -0,0 +1,56 @@
+from numbers import Number
+from streamlit_agraph.node import Node
+from streamlit_agraph.edge import Edge
+
+# Id of the node that stands for the collapsed children of a node. The component returns it when clicked,
+# so the app can expand the group (see 'collapse_groups')
+CLUSTER_PREFIX = "cluster:"
+
+def cluster_id(node_id):
+  return f"{CLUSTER_PREFIX}{node_id}"
+
+def is_cluster(node_id):
+  return isinstance(node_id, str) and node_id.startswith(CLUSTER_PREFIX)
+
+def collapse_groups(nodes, edges, threshold=25, expanded=()):
+  """
+  Level of detail for large graphs: the leaf children of a node (nodes whose only edge comes from it) are
+  collapsed into a single cluster node when there are more than 'threshold' of them, unless the cluster id is
+  in 'expanded'. The cluster node shows the number of nodes and, if their titles are numbers (e.g. distances),
+  their min/mean/max. Returns the new nodes and edges.
+  """
+  degree = {}
+  for edge in edges:
+    degree[edge.source] = degree.get(edge.source, 0) + 1
+    degree[edge.to] = degree.get(edge.to, 0) + 1
+
+  children = {}
+  for edge in edges:
+    if degree[edge.to] == 1 and edge.source != edge.to:
+      children.setdefault(edge.source, []).append(edge.to)
+
+  nodes_by_id = {node.id: node for node in nodes}
+  collapsed = {}
+  for parent, group in children.items():
+    if len(group) > threshold and cluster_id(parent) not in expanded and parent in nodes_by_id:
+      for child in group:
+        collapsed[child] = parent
+  if not collapsed:
+    return nodes, edges
+
+  new_nodes = [node for node in nodes if node.id not in collapsed]
+  new_edges = [edge for edge in edges if edge.to not in collapsed]
+  for parent, group in children.items():
+    group = [nodes_by_id[child] for child in group if collapsed.get(child) == parent and child in nodes_by_id]
+    if not group:
+      continue
+    values = [node.title for node in group if isinstance(node.title, Number)]
+    title = f"{len(group)} nodes"
+    if values:
+      title += f" (min. {min(values):.2f}, mean {sum(values) / len(values):.2f}, max. {max(values):.2f})"
+    title += ". Click to expand"
+    parent_node = nodes_by_id[parent]
+    new_nodes.append(Node(id=cluster_id(parent), label=f"+{len(group)}", title=title, shape="box",
+                          size=parent_node.size, color=group[0].color))
+    new_edges.append(Edge(source=parent, target=cluster_id(parent)))
+  return new_nodes, new_edges
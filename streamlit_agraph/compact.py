@@ -0,0 +1,42 @@
+import json
+
+# Keys that usually differ between nodes/edges, sent as columns; every other key is part of the style,
+# and elements with the same style share it
+COLUMN_KEYS = ("id", "label", "title", "from", "to", "x", "y")
+
+def encode_elements(items):
+  """
+  Encode node or edge dicts as a table: one array per key that every element has (ids, labels, titles...),
+  plus the distinct styles (the remaining keys) and the style index of every element. 'source' is dropped
+  from edges, as it repeats 'from'.
+  """
+  columns = {key: [] for key in COLUMN_KEYS if items and all(key in item for item in items)}
+  styles, style_index, style = [], {}, []
+  for item in items:
+    item_style = {key: value for key, value in item.items() if key not in columns and key != "source"}
+    style_key = json.dumps(item_style, sort_keys=True)
+    if style_key not in style_index:
+      style_index[style_key] = len(styles)
+      styles.append(item_style)
+    style.append(style_index[style_key])
+    for key, values in columns.items():
+      values.append(item[key])
+  return {"styles": styles, "style": style, "columns": columns}
+
+def decode_elements(table):
+  """Decode a table made by 'encode_elements' back to node or edge dicts."""
+  items = [dict(table["styles"][i]) for i in table["style"]]
+  for key, values in table["columns"].items():
+    for item, value in zip(items, values):
+      item[key] = value
+  return items
+
+def encode_graph(data):
+  """Compact form of a graph payload ('nodes' and 'edges' dicts), decoded by the component."""
+  return {"format": "columns", "nodes": encode_elements(data["nodes"]), "edges": encode_elements(data["edges"])}
+
+def decode_graph(data):
+  """Graph payload with 'nodes' and 'edges' dicts, from its plain or compact form."""
+  if data.get("format") != "columns":
+    return data
+  return {"nodes": decode_elements(data["nodes"]), "edges": decode_elements(data["edges"])}
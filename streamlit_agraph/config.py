@@ -144,7 +144,7 @@ class ConfigBuilder(object):
         group_expander.checkbox("groups", value=False, key="groups")
         if st.session_state.groups:
             if self.nodes:
-                groups = list(set([node.__dict__.get("group", None) for node in self.nodes]))
+                groups = list(set([node.options.get("group", None) for node in self.nodes]))
                 if None in groups:
                     groups.remove(None)
                 with group_expander:
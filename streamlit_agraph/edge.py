@@ -3,7 +3,11 @@
 class Edge:
   """
   https://visjs.github.io/vis-network/docs/network/edges.html
+
+  Edges are identified by their source, target, label and title, and keep any extra vis.js option in 'options'.
   """
+  __slots__ = ("source", "to", "color", "options")
+
   def __init__(self,
                source,
                target,
@@ -13,11 +17,32 @@ class Edge:
                **kwargs
                ):
     self.source=source
-    self.__dict__['from']=source
     self.to=target
     self.color=color
     # self.arrows={"to": arrows_to, "from": arrows_from}
-    self.__dict__.update(**kwargs)
+    self.options=kwargs
+
+  def __getattr__(self, name):
+    if name == "options":
+      raise AttributeError(name)
+    try:
+      return self.options[name]
+    except KeyError:
+      raise AttributeError(name) from None
+
+  def _key(self):
+    return self.source, self.to, self.options.get("label"), self.options.get("title")
+
+  def __eq__(self, other):
+    if not isinstance(other, Edge):
+      return NotImplemented
+    return self._key() == other._key()
+
+  def __hash__(self):
+    return hash(self._key())
+
+  def __repr__(self):
+    return f"Edge(source={self.source!r}, target={self.to!r})"
 
   def to_dict(self):
-    return self.__dict__
\ No newline at end of file
+    return {"source": self.source, "from": self.source, "to": self.to, "color": self.color, **self.options}
@@ -1,23 +1,23 @@
 self.__precacheManifest = (self.__precacheManifest || []).concat([
   {
-    "revision": "84d1f1933aefb375528ed8be4ef67c69",
+    "revision": "d968e407325a221f8492e3301c58b3ef",
     "url": "./index.html"
   },
   {
-    "revision": "7ef94bc7e178b9d42901",
+    "revision": "761193cbb7d1f0d6c629",
     "url": "./static/css/2.67975c90.chunk.css"
   },
   {
-    "revision": "7ef94bc7e178b9d42901",
-    "url": "./static/js/2.1f52b185.chunk.js"
+    "revision": "761193cbb7d1f0d6c629",
+    "url": "./static/js/2.607f6d9d.chunk.js"
   },
   {
     "revision": "d2e11bed97bb9d9d0b1819932469a067",
-    "url": "./static/js/2.1f52b185.chunk.js.LICENSE.txt"
+    "url": "./static/js/2.607f6d9d.chunk.js.LICENSE.txt"
   },
   {
-    "revision": "e79dfbc0954caf77bf8c",
-    "url": "./static/js/main.5f84d5ed.chunk.js"
+    "revision": "064ebd15b4665c2fd531",
+    "url": "./static/js/main.78bc183d.chunk.js"
   },
   {
     "revision": "de282f2a2b9df9e3cc4c",
@@ -1,2 +0,0 @@
-(this["webpackJsonpstreamlit-agraph"]=this["webpackJsonpstreamlit-agraph"]||[]).push([[0],{31:function(e,t,n){e.exports=n(43)},43:function(e,t,n){"use strict";n.r(t);var r=n(5),a=n.n(r),l=n(25),o=n.n(l),i=n(26),c=(n(6),n(1)),s=n(0),p=n(2),u=n(3),m=n(13),d=n(30),h=function(e){Object(p.a)(n,e);var t=Object(u.a)(n);function n(){var e;Object(s.a)(this,n);for(var r=arguments.length,l=new Array(r),o=0;o<r;o++)l[o]=arguments[o];return(e=t.call.apply(t,[this].concat(l))).render=function(){for(var t=JSON.parse(e.props.args.data),n=t.nodes.slice(),r=0;r<n.length;r++)n[r].title&&(n[r].div=e.htmlTitle(n[r].title));var l=JSON.parse(e.props.args.config),o={selectNode:function(e){m.Streamlit.setComponentValue(e.nodes[0])}};return a.a.createElement("span",null,a.a.createElement(d.a,{graph:t,options:l,events:o,getNetwork:function(e){}}))},e.htmlTitle=function(e){var t=document.createElement("div");return t.innerHTML=e,t},e}return Object(c.a)(n)}(m.StreamlitComponentBase),f=Object(m.withStreamlitConnection)(h);o.a.render(a.a.createElement(a.a.StrictMode,null,a.a.createElement(i.StreamlitProvider,null,a.a.createElement(f,null))),document.getElementById("root"))}},[[31,1,2]]]);
-//# sourceMappingURL=main.5f84d5ed.chunk.js.map
\ No newline at end of file
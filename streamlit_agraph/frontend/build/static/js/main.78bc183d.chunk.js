@@ -0,0 +1,2 @@
+(this["webpackJsonpstreamlit-agraph"]=this["webpackJsonpstreamlit-agraph"]||[]).push([[0],{31:function(e,t,n){e.exports=n(43)},43:function(e,t,n){"use strict";n.r(t);var r=n(5),a=n.n(r),o=n(26),s=n.n(o),l=n(27),i=n(6),c=n(1),p=n(0),u=n(2),d=n(3),v=n(11),m=n(22);function f(e){if(Array.isArray(e))return e;for(var t=e.style.map((function(t){return Object.assign({},e.styles[t])})),n=0,r=Object.keys(e.columns);n<r.length;n++)for(var a=r[n],o=e.columns[a],s=0;s<t.length;s++)t[s][a]=o[s];return t}function g(e){return"columns"!==e.format?e:{nodes:f(e.nodes),edges:f(e.edges)}}var h=function(e){Object(u.a)(n,e);var t=Object(d.a)(n);function n(){var e;Object(p.a)(this,n);for(var r=arguments.length,o=new Array(r),s=0;s<r;s++)o[s]=arguments[s];return(e=t.call.apply(t,[this].concat(o))).network=null,e.revision=null,e.pendingDeltas=[],e.deltaGraph={nodes:[],edges:[]},e.events={selectNode:function(e){v.Streamlit.setComponentValue(e.nodes[0])}},e.render=function(){var t=JSON.parse(e.props.args.config);if(e.props.args.delta)return e.pendingDeltas.push(JSON.parse(e.props.args.delta)),e.applyDeltas(),a.a.createElement("span",null,a.a.createElement(m.a,{graph:e.deltaGraph,options:t,events:e.events,getNetwork:function(t){e.network=t,e.applyDeltas()}}));for(var n=g(JSON.parse(e.props.args.data)),r=n.nodes.slice(),o=0;o<r.length;o++)r[o].title&&(r[o].div=e.htmlTitle(r[o].title));return a.a.createElement("span",null,a.a.createElement(m.a,{graph:n,options:t,events:e.events,getNetwork:function(e){}}))},e.applyDeltas=function(){if(e.network){var t,n=e.network.body.data.nodes,r=e.network.body.data.edges,a=Object(i.a)(e.pendingDeltas);try{for(a.s();!(t=a.n()).done;){var o=t.value;if(o.revision!==e.revision){if(null===o.base)n.clear(),r.clear();else if(o.base!==e.revision)return e.pendingDeltas=[],void v.Streamlit.setComponentValue({resync:"".concat(o.revision,"-").concat(Date.now())});var s,l=f(o.nodes),c=Object(i.a)(l);try{for(c.s();!(s=c.n()).done;){var p=s.value;p.title&&(p.div=e.htmlTitle(p.title))}}catch(u){c.e(u)}finally{c.f()}r.remove(o.remove_edges),n.remove(o.remove_nodes),n.update(l),r.update(f(o.edges)),e.revision=o.revision}}}catch(u){a.e(u)}finally{a.f()}e.pendingDeltas=[]}},e.htmlTitle=function(e){var t=document.createElement("div");return t.innerHTML=e,t},e}return Object(c.a)(n)}(v.StreamlitComponentBase),y=Object(v.withStreamlitConnection)(h);s.a.render(a.a.createElement(a.a.StrictMode,null,a.a.createElement(l.StreamlitProvider,null,a.a.createElement(y,null))),document.getElementById("root"))}},[[31,1,2]]]);
+//# sourceMappingURL=main.78bc183d.chunk.js.map
\ No newline at end of file
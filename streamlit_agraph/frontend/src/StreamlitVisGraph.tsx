@@ -7,51 +7,91 @@ import React, { ReactNode } from "react"
 import VisGraph from 'react-vis-graph-wrapper';
 
 
+// Decode the compact (columnar) payload: shared styles, plus one array per key that every element has
+function decodeElements(table) {
+  if (Array.isArray(table)) {
+    return table;
+  }
+  const items = table.style.map((i) => Object.assign({}, table.styles[i]));
+  for (const key of Object.keys(table.columns)) {
+    const values = table.columns[key];
+    for (let i = 0; i < items.length; i++) {
+      items[i][key] = values[i];
+    }
+  }
+  return items;
+}
+
+function decodeGraph(graph) {
+  if (graph.format !== "columns") {
+    return graph;
+  }
+  return { nodes: decodeElements(graph.nodes), edges: decodeElements(graph.edges) };
+}
+
 class StreamlitVisGraph extends StreamlitComponentBase {
 
+  // Delta mode: the network is kept between reruns and Python sends the changes of the graph,
+  // numbered by revision ('base' is the revision they apply to, null when the whole graph is sent)
+  private network: any = null;
+  private revision: number | null = null;
+  private pendingDeltas: any[] = [];
+  private deltaGraph = { nodes: [], edges: [] };  // stable, so VisGraph never diffs it
+
+  private events = {
+
+    selectNode: (event:any) => {
+      Streamlit.setComponentValue(event.nodes[0]);
+    }
+
+    // doubleClick: (event:any) => {
+    //   console.log(event.nodes);
+    //   // let link = nodes;
+    //   let lookup_node = lookup_node_id(event.nodes[0], nodes);
+    //   let link = lookup_node.div.innerHTML;
+    //   if(link){
+    //     window.open(link);
+    //   }
+    // }
+  };
+
   public render = (): ReactNode => {
 
-    function lookup_node_id(lookup_node, mynodes){
-      for (let node of mynodes){
-          if (node.id === lookup_node){
-              return node;
-          }
-    }}
+    const options = JSON.parse(this.props.args["config"]);
+
+    if (this.props.args["delta"]) {
+      this.pendingDeltas.push(JSON.parse(this.props.args["delta"]));
+      this.applyDeltas();
+      return (
+        <span>
+        <VisGraph
+        graph={this.deltaGraph}
+        options={options}
+        events={this.events}
+        getNetwork={(network: any) => {
+          this.network = network;
+          this.applyDeltas();
+        }}/>
+        </span>
+      )
+    }
+
+    var graph = decodeGraph(JSON.parse(this.props.args["data"]));
 
-    var graph = JSON.parse(this.props.args["data"]);
-    
     var nodes = graph.nodes.slice();
 
     for (let i = 0; i < nodes.length; i++) {
       if(nodes[i].title)
         nodes[i].div = this.htmlTitle(nodes[i].title);
     }
-  
-    const options = JSON.parse(this.props.args["config"]);
-
-    const events = {
 
-      selectNode: (event:any) => {
-        Streamlit.setComponentValue(event.nodes[0]);
-      }
-
-      // doubleClick: (event:any) => {
-      //   console.log(event.nodes);
-      //   // let link = nodes;
-      //   let lookup_node = lookup_node_id(event.nodes[0], nodes);
-      //   let link = lookup_node.div.innerHTML;
-      //   if(link){
-      //     window.open(link);
-      //   }
-      // }
-    };
     return (
       <span>
-    
+
       <VisGraph
       graph={graph}
       options={options}
-      events={events}
+      events={this.events}
       getNetwork={(network: any) => {
         //  if you want access to vis.js network api you can set the state in a parent component using this property
         //console.log(network);
@@ -60,7 +100,41 @@ class StreamlitVisGraph extends StreamlitComponentBase {
     )
   }
 
-  private htmlTitle = (html):any => {   
+  private applyDeltas = () => {
+    if (!this.network) {
+      return;  // applied once the network is created
+    }
+    const nodes = this.network.body.data.nodes;
+    const edges = this.network.body.data.edges;
+
+    for (let delta of this.pendingDeltas) {
+      if (delta.revision === this.revision) {
+        continue;  // already applied (the component rendered again with the same args)
+      }
+      if (delta.base === null) {
+        nodes.clear();
+        edges.clear();
+      } else if (delta.base !== this.revision) {
+        // Missed a revision: ask Python to send the whole graph
+        this.pendingDeltas = [];
+        Streamlit.setComponentValue({ resync: `${delta.revision}-${Date.now()}` });
+        return;
+      }
+      const deltaNodes = decodeElements(delta.nodes);
+      for (let node of deltaNodes) {
+        if(node.title)
+          node.div = this.htmlTitle(node.title);
+      }
+      edges.remove(delta.remove_edges);
+      nodes.remove(delta.remove_nodes);
+      nodes.update(deltaNodes);
+      edges.update(decodeElements(delta.edges));
+      this.revision = delta.revision;
+    }
+    this.pendingDeltas = [];
+  }
+
+  private htmlTitle = (html):any => {
     const container = document.createElement("div");
     container.innerHTML = html;
     return container;
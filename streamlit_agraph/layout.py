@@ -0,0 +1,110 @@
+import numpy as np
+
+# Server-side layouts: node positions are computed in Python and sent as x/y, so the browser can render the
+# graph with physics disabled instead of running the solver (https://visjs.github.io/vis-network/docs/network/nodes.html)
+
+def _spanning_tree(nodes, edges, root=None):
+  """BFS tree (ignoring direction) from the root (the first node by default): parent of every node and BFS order.
+  Nodes not connected to the root are attached to it."""
+  index = {node.id: i for i, node in enumerate(nodes)}
+  neighbors = [[] for _ in nodes]
+  for edge in edges:
+    u, v = index.get(edge.source), index.get(edge.to)
+    if u is not None and v is not None and u != v:
+      neighbors[u].append(v)
+      neighbors[v].append(u)
+
+  start = index[root] if root is not None else 0
+  parent = np.full(len(nodes), -1)
+  parent[start] = start
+  order = [start]
+  for u in order:
+    for v in neighbors[u]:
+      if parent[v] < 0:
+        parent[v] = u
+        order.append(v)
+  for v in np.flatnonzero(parent < 0):
+    parent[v] = start
+    order.append(int(v))
+  return parent, order
+
+def radial_layout(nodes, edges, root=None, radius=150):
+  """
+  Positions of the nodes on rings around the root, one ring per BFS level. Every node gets an angular sector
+  proportional to the number of leaves under it, so the children of a node (e.g. the end nodes of a relation)
+  are grouped around it.
+  """
+  positions = np.zeros((len(nodes), 2))
+  if not nodes:
+    return positions
+  parent, order = _spanning_tree(nodes, edges, root)
+  start = order[0]
+
+  leaves = np.zeros(len(nodes))
+  children = [[] for _ in nodes]
+  for v in reversed(order[1:]):
+    leaves[v] = max(leaves[v], 1)
+    leaves[parent[v]] += leaves[v]
+    children[parent[v]].append(v)
+
+  depth = np.zeros(len(nodes))
+  sector = np.zeros((len(nodes), 2))
+  sector[start] = (0, 2 * np.pi)
+  for u in order:
+    lo, hi = sector[u]
+    kids = children[u][::-1]  # back to BFS order
+    if not kids:
+      continue
+    bounds = lo + (hi - lo) * np.concatenate(([0], np.cumsum(leaves[kids]))) / leaves[kids].sum()
+    sector[kids] = np.column_stack((bounds[:-1], bounds[1:]))
+    depth[kids] = depth[u] + 1
+
+  angles = sector.mean(axis=1)
+  positions[:, 0] = depth * radius * np.cos(angles)
+  positions[:, 1] = depth * radius * np.sin(angles)
+  return positions
+
+def force_layout(nodes, edges, iterations=50, distance=100, root=None, max_nodes=300):
+  """
+  Positions of the nodes by a force-directed (Fruchterman-Reingold) layout, vectorized with NumPy. It starts
+  from the radial layout, so the result is deterministic. Memory and time are quadratic in the number of nodes,
+  so graphs with more than 'max_nodes' nodes keep the radial layout.
+  """
+  positions = radial_layout(nodes, edges, root=root, radius=distance).astype(np.float32)
+  n = len(nodes)
+  if n < 2 or n > max_nodes:
+    return positions.astype(np.float64)
+  index = {node.id: i for i, node in enumerate(nodes)}
+  pairs = np.array([(index[e.source], index[e.to]) for e in edges if e.source in index and e.to in index],
+                   dtype=np.int64).reshape(-1, 2)
+  src, dst = pairs[:, 0], pairs[:, 1]
+
+  temperature = distance * np.sqrt(n) / 2
+  for _ in range(iterations):
+    # Repulsion k^2/d between every pair of nodes
+    dx = positions[:, 0, None] - positions[None, :, 0]
+    dy = positions[:, 1, None] - positions[None, :, 1]
+    dist2 = np.maximum(dx * dx + dy * dy, 1e-2)
+    force = distance ** 2 / dist2
+    np.fill_diagonal(force, 0)
+    displacement = np.column_stack(((dx * force).sum(axis=1), (dy * force).sum(axis=1)))
+    # Attraction d^2/k along the edges
+    delta = positions[src] - positions[dst]
+    pull = delta * (np.linalg.norm(delta, axis=1, keepdims=True) / distance)
+    np.subtract.at(displacement, src, pull)
+    np.add.at(displacement, dst, pull)
+    # Move at most 'temperature', which cools down
+    length = np.maximum(np.linalg.norm(displacement, axis=1, keepdims=True), 1e-9)
+    positions += displacement / length * np.minimum(length, temperature)
+    temperature *= 0.9
+  return (positions - positions[0]).astype(np.float64)  # root at the origin
+
+LAYOUTS = {"radial": radial_layout, "force": force_layout}
+
+def apply_layout(nodes, edges, method="radial", **kwargs):
+  """Set the x/y position of the nodes with a layout ('radial' or 'force'). Render them with physics disabled."""
+  positions = LAYOUTS[method](nodes, edges, **kwargs)
+  for node, (x, y) in zip(nodes, positions.round(1).tolist()):
+    node.options["x"] = x
+    node.options["y"] = y
+  return nodes
@@ -1,5 +1,12 @@
 
 class Node:
+  """
+  https://visjs.github.io/vis-network/docs/network/nodes.html
+
+  Nodes are identified by their id (equal ids, equal nodes), and keep any extra vis.js option in 'options'.
+  """
+  __slots__ = ("id", "title", "label", "shape", "size", "color", "options")
+
   def __init__(self,
               id,
               title=None, # displayed if hovered
@@ -18,7 +25,27 @@ class Node:
     self.shape=shape # # image, circularImage, diamond, dot, star, triangle, triangleDown, hexagon, square and icon
     self.size=size
     self.color=color #FDD2BS #F48B94 #F7A7A6 #DBEBC2
-    self.__dict__.update(**kwargs)
+    self.options=kwargs
+
+  def __getattr__(self, name):
+    if name == "options":
+      raise AttributeError(name)
+    try:
+      return self.options[name]
+    except KeyError:
+      raise AttributeError(name) from None
+
+  def __eq__(self, other):
+    if not isinstance(other, Node):
+      return NotImplemented
+    return self.id == other.id
+
+  def __hash__(self):
+    return hash(self.id)
+
+  def __repr__(self):
+    return f"Node(id={self.id!r})"
 
   def to_dict(self):
-    return self.__dict__
\ No newline at end of file
+    return {"id": self.id, "title": self.title, "label": self.label, "shape": self.shape, "size": self.size,
+            "color": self.color, **self.options}
@@ -2,7 +2,17 @@ from streamlit_agraph.node import Node
 from streamlit_agraph.edge import Edge
 
 class Triple:
+  __slots__ = ("subj", "pred", "obj")
+
   def __init__(self, subj: Node, pred: Edge, obj:Node ) -> None:
     self.subj = subj
     self.pred = pred
     self.obj = obj
+
+  def __eq__(self, other):
+    if not isinstance(other, Triple):
+      return NotImplemented
+    return (self.subj, self.pred, self.obj) == (other.subj, other.pred, other.obj)
+
+  def __hash__(self):
+    return hash((self.subj, self.pred, self.obj))
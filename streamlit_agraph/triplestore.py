@@ -1,23 +1,100 @@
-from typing import List, Set
+from typing import Any, Dict, List, Set
+import numpy as np
+import pandas as pd
 from streamlit_agraph.config import Config
 from streamlit_agraph.triple import Triple
 from streamlit_agraph.node import Node
 from streamlit_agraph.edge import Edge
 
+def _column(values) -> pd.Series:
+  if hasattr(values, "to_pandas"):  # Arrow array / chunked array
+    values = values.to_pandas()
+  return pd.Series(values).reset_index(drop=True)
+
+def _intern(index: pd.Index, values: pd.Series):
+  """Ids of the values in 'index', appending the values not in it yet. Returns the new index and the ids."""
+  codes, uniques = pd.factorize(values)
+  ids = index.get_indexer(uniques) if len(index) else np.full(len(uniques), -1)
+  new = ids < 0
+  ids[new] = len(index) + np.arange(np.count_nonzero(new))
+  if new.any():
+    index = index.append(pd.Index(uniques[new])) if len(index) else pd.Index(uniques[new])
+  return index, ids[codes].astype(np.int64)
+
 class TripleStore:
   def __init__(self) ->None:
     self.nodes_set: Set[Node] = set()
     self.edges_set: Set[Edge] = set()
     self.triples_set: Set[Triple] = set()
+    self._nodes: Dict[Any, Node] = {}  # interned nodes by id, so every id has a single Node
+
+    # Triples added in bulk, as id arrays: node_names[src] -pred_names[pred]-> node_names[dst]
+    self.node_names = pd.Index([])
+    self.pred_names = pd.Index([])
+    self.src = np.empty(0, dtype=np.int64)
+    self.pred = np.empty(0, dtype=np.int64)
+    self.dst = np.empty(0, dtype=np.int64)
+
+  def _node(self, id, **kwargs) -> Node:
+    node = self._nodes.get(id)
+    if node is None:
+      node = self._nodes[id] = Node(id=id, **kwargs)
+    return node
 
   def add_triple(self, node1, link, node2, image=""):
-    nodeA = Node(id=node1, image=image)
-    nodeB = Node(id=node2)
+    nodeA = self._node(node1, image=image)
+    nodeB = self._node(node2)
     edge = Edge(source=nodeA.id, target=nodeB.id, title=link)  # linkValue=link
-    triple = Triple(nodeA, edge, nodeB)
-    self.nodes_set.update([nodeA, nodeB])
+    if edge in self.edges_set:
+      return  # duplicate triple
+    self.nodes_set.add(nodeA)
+    self.nodes_set.add(nodeB)
     self.edges_set.add(edge)
-    self.triples_set.add(triple)
+    self.triples_set.add(Triple(nodeA, edge, nodeB))
+
+  def add_triples(self, subjects, predicates, objects):
+    """
+    Add triples in bulk from columns (lists, NumPy arrays, DataFrame columns or Arrow arrays). Nodes and
+    predicates are interned into integer ids in one vectorized pass, without creating Node/Edge objects;
+    duplicate triples are dropped.
+    """
+    subjects, predicates, objects = _column(subjects), _column(predicates), _column(objects)
+    if not len(subjects) == len(predicates) == len(objects):
+      raise ValueError("subjects, predicates and objects must have the same length")
+
+    self.node_names, node_ids = _intern(self.node_names, pd.concat((subjects, objects), ignore_index=True))
+    self.pred_names, pred_ids = _intern(self.pred_names, predicates)
+
+    src = np.concatenate((self.src, node_ids[:len(subjects)]))
+    pred = np.concatenate((self.pred, pred_ids))
+    dst = np.concatenate((self.dst, node_ids[len(subjects):]))
+    unique = ~pd.DataFrame({"src": src, "pred": pred, "dst": dst}).duplicated().to_numpy()
+    self.src, self.pred, self.dst = src[unique], pred[unique], dst[unique]
+
+  def to_arrays(self):
+    """
+    All the triples as id arrays, for the graph algorithms: (src, dst, node_names), where node_names[id] is
+    the name of node id. Triples added one at a time are interned after the bulk ones, and those also added
+    in bulk are dropped.
+    """
+    if not self.nodes_set:
+      return self.src, self.dst, self.node_names
+    edges = list(self.edges_set)
+    names = pd.Series([n.id for n in self.nodes_set] + [e.source for e in edges] + [e.to for e in edges], dtype=object)
+    node_names, ids = _intern(self.node_names, names)
+    _, pred_ids = _intern(self.pred_names, pd.Series([e.options.get("title") for e in edges], dtype=object))
+    start = len(self.nodes_set)
+    src = np.concatenate((self.src, ids[start:start + len(edges)]))
+    pred = np.concatenate((self.pred, pred_ids))
+    dst = np.concatenate((self.dst, ids[start + len(edges):]))
+    unique = ~pd.DataFrame({"src": src, "pred": pred, "dst": dst}).duplicated().to_numpy()
+    return src[unique], dst[unique], node_names
+
+  def __len__(self):
+    """Number of distinct triples; a triple added both one at a time and in bulk counts once."""
+    if not self.triples_set:
+      return len(self.src)
+    return len(self.to_arrays()[0])
 
   def getTriples(self)->Set[Triple]:
     return self.triples_set
@@ -26,4 +103,4 @@ class TripleStore:
     return self.nodes_set
 
   def getEdges(self)->Set[Edge]:
-    return self.edges_set
\ No newline at end of file
+    return self.edges_set
@@ -53,6 +53,16 @@ NODE = {
         "FOR_EXAMPLE": "EXAMPLES",
         "INTERVENTION_IS": "INTERVENTIONS",
         "THE_OPPOSITE_IS": "OPPOSITES"
+    },
+    "incoming_relation_label": {  # labels of the relations of the links pointing to the sentence
+        "EQUIVALENT": "EQUIVALENT OF",
+        "CAUSE_IS": "CAUSE OF",
+        "CONSEQUENCE_IS": "CONSEQUENCE OF",
+        "SIMILARLY": "SIMILAR TO",
+        "ADDITIONALLY": "ADDITION TO",
+        "FOR_EXAMPLE": "EXAMPLE OF",
+        "INTERVENTION_IS": "INTERVENTION FOR",
+        "THE_OPPOSITE_IS": "OPPOSITE OF"
     }
 }
 